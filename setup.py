@@ -37,5 +37,5 @@ setup(
         'divisors, number theory',
         package_dir={'': 'src'},
         packages=find_packages(where='src'),
-        install_requires=['argparse', 'numpy', 'tqdm'],
+        install_requires=['argparse', 'numpy'],
     )
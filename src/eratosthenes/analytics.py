@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Streaming analytics of prime gaps and prime constellations."""
+
+import numpy as np
+
+
+# Prime constellations as alternative patterns of consecutive prime gaps
+# (cousin pair p, p+4 with p+2 also prime only occurs for 3, 7)
+CONSTELLATIONS = {
+    'twin': ((2,),),
+    'cousin': ((4,), (2, 2)),
+    'triplet': ((2, 4), (4, 2)),
+    'quadruplet': ((2, 4, 2),),
+    }
+
+
+class PrimeAnalytics(object):
+    """Define analytics pass fed with consecutive chunks of primes.
+
+    Each chunk is processed with vectorized differences; the last primes of
+    a chunk are carried over so that gaps and constellations across chunk
+    boundaries are counted exactly once.
+    """
+
+    title = 'Prime analytics'
+
+    def __init__(self, constellations=CONSTELLATIONS):
+        self.constellations = constellations
+        self.carry = max(len(pattern) for patterns in constellations.values()
+                         for pattern in patterns) + 1
+        self.tail = np.zeros(0, dtype=np.int64)
+        self.count = 0
+        self.last = None
+        self.max_gap = 0
+        self.records = []
+        self.histogram = np.zeros(0, dtype=np.int64)
+        self.tuples = dict.fromkeys(constellations, 0)
+
+    def update(self, chunk):
+        """Process next chunk of consecutive primes."""
+        chunk = np.asarray(chunk, dtype=np.int64)
+        if len(chunk) == 0:
+            return
+        self.count += len(chunk)
+        self.last = int(chunk[-1])
+        primes = np.concatenate([self.tail, chunk])
+        gaps = np.diff(primes)
+        # Index of first gap that ends at a prime of this chunk
+        first = max(len(self.tail) - 1, 0)
+        new_gaps = gaps[first:]
+        if len(new_gaps) > 0:
+            # Gap histogram
+            counts = np.bincount(new_gaps)
+            if len(counts) > len(self.histogram):
+                counts[:len(self.histogram)] += self.histogram
+                self.histogram = counts
+            else:
+                self.histogram[:len(counts)] += counts
+            # Record (maximal) gaps
+            prior = np.maximum.accumulate(
+                np.concatenate([[self.max_gap], new_gaps]))[:-1]
+            records = np.flatnonzero(new_gaps > prior)
+            for i in records.tolist():
+                self.records.append((int(new_gaps[i]),
+                                     int(primes[first + i])))
+            self.max_gap = max(self.max_gap, int(new_gaps.max()))
+        # Constellations ending in this chunk
+        for name, patterns in self.constellations.items():
+            for pattern in patterns:
+                windows = len(gaps) - len(pattern) + 1
+                if windows <= 0:
+                    continue
+                match = np.ones(windows, dtype=bool)
+                for j, gap in enumerate(pattern):
+                    match &= gaps[j:j + windows] == gap
+                start = max(first - len(pattern) + 1, 0)
+                self.tuples[name] += int(np.count_nonzero(match[start:]))
+        self.tail = primes[-self.carry:]
+
+    def gap_histogram(self):
+        """Return list of (gap, count) for all occurring gaps."""
+        gaps = np.flatnonzero(self.histogram)
+        return list(zip(gaps.tolist(), self.histogram[gaps].tolist()))
+
+    def header(self):
+        """Return summary rows for output header."""
+        rows = [['Counted prime numbers', self.count],
+                ['Largest prime', '-' if self.last is None else self.last]]
+        for name in self.constellations:
+            rows.append(['Prime {}s'.format(name), self.tuples[name]])
+        rows.append(['Maximal gap', self.max_gap])
+        for gap, prime in self.records:
+            rows.append(['Record gap {}'.format(gap), 'after {}'.format(prime)])
+        for gap, count in self.gap_histogram():
+            rows.append(['Gap {}'.format(gap), count])
+        return rows
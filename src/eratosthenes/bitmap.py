@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bit-packed odd-only prime bitmap with rank/select index."""
+
+import numpy as np
+
+
+# Number of set bits for every possible byte value
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class PrimeBitmap(object):
+    """Define compact prime table (one bit per odd integer).
+
+    Bit i (little bit order) represents the odd integer 2*i+1. A sampled
+    popcount (rank) index every `block_bytes` bytes gives O(1) prime
+    counting; a select index every `select_rate` primes narrows the search
+    for the n-th prime to a few blocks.
+    """
+
+    def __init__(self, bits, limit, block_bytes=64, select_rate=4096):
+        self.limit = limit
+        self.block_bytes = block_bytes
+        self.select_rate = select_rate
+        nbits = (limit + 1) // 2 if limit >= 1 else 0
+        bits = np.ascontiguousarray(bits, dtype=np.uint8)[:(nbits + 7) // 8]
+        bits = bits.copy() if not bits.flags.writeable else bits
+        if nbits > 0:
+            bits[0] &= 0xfe                 # 1 is not prime
+            if nbits % 8:                   # clear padding bits beyond limit
+                bits[-1] &= (1 << (nbits % 8)) - 1
+        self.bits = bits
+        self.nbits = nbits
+        self.rank = self._build_rank()
+        self.select = self._build_select()
+
+    def _build_rank(self):
+        """Build cumulative popcount at every block boundary."""
+        nblocks = -(-len(self.bits) // self.block_bytes)
+        counts = np.zeros(nblocks, dtype=np.int64)
+        # Count block-wise in chunks to avoid a full-size temporary array
+        chunk = self.block_bytes * 65536
+        for start in range(0, len(self.bits), chunk):
+            part = self.bits[start:start + chunk]
+            pad = -len(part) % self.block_bytes
+            if pad:
+                part = np.concatenate([part, np.zeros(pad, dtype=np.uint8)])
+            blocks = POPCOUNT[part].reshape(-1, self.block_bytes)
+            first = start // self.block_bytes
+            counts[first:first + len(blocks)] = blocks.sum(axis=1)
+        rank = np.zeros(nblocks + 1, dtype=np.int64)
+        np.cumsum(counts, out=rank[1:])
+        return rank
+
+    def _build_select(self):
+        """Build block index of every `select_rate`-th odd prime."""
+        targets = np.arange(1, self.rank[-1] + 1, self.select_rate)
+        return np.searchsorted(self.rank, targets, side='left') - 1
+
+    @classmethod
+    def from_primes(cls, primes, limit, **kwargs):
+        """Create bitmap from a sorted sequence of primes up to limit."""
+        nbits = (limit + 1) // 2 if limit >= 1 else 0
+        flags = np.zeros(nbits, dtype=bool)
+        primes = np.asarray(primes, dtype=np.int64)
+        primes = primes[(primes % 2 == 1) & (primes <= limit)]
+        flags[primes // 2] = True
+        return cls(np.packbits(flags, bitorder='little'), limit, **kwargs)
+
+    def _rank_bits(self, m):
+        """Count set bits among the first m bits."""
+        byte, rem = m >> 3, m & 7
+        block = byte // self.block_bytes
+        count = int(self.rank[block])
+        count += int(POPCOUNT[self.bits[block * self.block_bytes:byte]].sum(
+            dtype=np.int64))
+        if rem:
+            count += int(POPCOUNT[self.bits[byte] & ((1 << rem) - 1)])
+        return count
+
+    def is_prime(self, number):
+        """Check if number is prime."""
+        if number == 2:
+            return True
+        if number < 2 or number % 2 == 0:
+            return False
+        if number > self.limit:
+            raise ValueError('{} exceeds bitmap limit '
+                             '{}'.format(number, self.limit))
+        i = number >> 1
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def pi(self, number):
+        """Count primes less than or equal to number."""
+        if number < 2:
+            return 0
+        if number > self.limit:
+            raise ValueError('{} exceeds bitmap limit '
+                             '{}'.format(number, self.limit))
+        return 1 + self._rank_bits((number - 1) // 2 + 1)
+
+    def nth_prime(self, n):
+        """Determine n-th prime (1-based)."""
+        if n < 1 or n > len(self):
+            raise IndexError('prime index {} out of range'.format(n))
+        if n == 1 or self.limit < 2:
+            return 2
+        target = n - 1                      # target-th set bit (1-based)
+        # Narrow block search with select index
+        sample = (target - 1) // self.select_rate
+        lo = int(self.select[sample])
+        if sample + 1 < len(self.select):
+            hi = int(self.select[sample + 1]) + 1
+        else:
+            hi = len(self.rank) - 1
+        block = lo + int(np.searchsorted(self.rank[lo:hi + 1], target,
+                                         side='left')) - 1
+        # Locate byte within block, then bit within byte
+        start = block * self.block_bytes
+        cum = self.rank[block] + np.cumsum(
+            POPCOUNT[self.bits[start:start + self.block_bytes]],
+            dtype=np.int64)
+        offset = int(np.searchsorted(cum, target, side='left'))
+        remaining = target - (int(cum[offset - 1]) if offset else
+                              int(self.rank[block]))
+        byte = int(self.bits[start + offset])
+        for bit in range(8):
+            if byte >> bit & 1:
+                remaining -= 1
+                if remaining == 0:
+                    return 2 * ((start + offset) * 8 + bit) + 1
+
+    def iter_chunks(self, chunk_bytes=65536):
+        """Iterate over primes as NumPy arrays of consecutive primes."""
+        if self.limit >= 2:
+            yield np.array([2], dtype=np.int64)
+        for start in range(0, len(self.bits), chunk_bytes):
+            flags = np.unpackbits(self.bits[start:start + chunk_bytes],
+                                  bitorder='little')
+            yield 2 * (np.flatnonzero(flags) + start * 8) + 1
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk.tolist()
+
+    def __len__(self):
+        return int(self.rank[-1]) + (1 if self.limit >= 2 else 0)
+
+    def __contains__(self, number):
+        return 0 <= number <= self.limit and self.is_prime(number)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.nth_prime(i + 1)
+                    for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('prime index out of range')
+        return self.nth_prime(index + 1)
+
+    def __repr__(self):
+        return 'PrimeBitmap(limit={}, num_primes={})'.format(self.limit,
+                                                             len(self))
+
+    @property
+    def nbytes(self):
+        """Return memory used by bitmap and indexes in bytes."""
+        return self.bits.nbytes + self.rank.nbytes + self.select.nbytes
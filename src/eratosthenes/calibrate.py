@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Calibration profile for automatic selection of the sieve engine."""
+
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import platform
+import time
+import classes
+import functions as fn
+
+
+# Candidate engines (sieve method, divisor method, worker processes,
+# threads)
+engines = {
+    '6k': {'sievemethod': '6k', 'divisormethod': 'sqrt-odd', 'jobs': 1},
+    '6k-parallel': {'sievemethod': '6k', 'divisormethod': 'sqrt-odd',
+                    'jobs': 0},
+    'bitmap': {'sievemethod': 'bitmap', 'divisormethod': 'sqrt-odd',
+               'jobs': 1},
+    'bitmap-threads': {'sievemethod': 'bitmap', 'divisormethod': 'sqrt-odd',
+                       'jobs': 1, 'threads': 0},
+    'bytearray': {'sievemethod': 'bytearray', 'divisormethod': 'sqrt-odd',
+                  'jobs': 1},
+    }
+# Crossovers used without calibration profile
+default_crossovers = [[0, '6k'], [1000, 'bitmap']]
+# Calibration stops timing an engine once a run exceeds this time
+time_cap = 2.0
+
+
+def default_path():
+    """Determine default path of calibration profile."""
+    config = os.environ.get('XDG_CONFIG_HOME',
+                            os.path.join(os.path.expanduser('~'), '.config'))
+    return os.path.join(config, 'eratosthenes', 'calibration.json')
+
+
+def available_engines():
+    """Select engines that make sense on this host."""
+    names = list(engines)
+    if multiprocessing.cpu_count() < 2:
+        names.remove('6k-parallel')
+        names.remove('bitmap-threads')
+    return names
+
+
+def run_engine(name, limit):
+    """Run engine on [0, limit] in memory mode without output."""
+    spec = engines[name]
+    divisor_method = classes.DivisorMethod(spec['divisormethod'])
+    sieve_method = classes.SieveMethod(spec['sievemethod'])
+    settings = classes.Settings(divisor_method.name, sieve_method.name, '',
+                                limit, 0, False, 'memory', 'never', False,
+                                '', None, '.temp', jobs=spec['jobs'],
+                                threads=spec.get('threads', 1))
+    return fn.select_algorithm_memory_mode(divisor_method, sieve_method,
+                                           settings, -1)
+
+
+def time_engine(name, limit, repeat=5, minimum=0.1):
+    """Determine best wall-clock time of engine on [0, limit]."""
+    best = None
+    total = 0
+    for i in range(repeat):
+        start = time.perf_counter()
+        run_engine(name, limit)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        total += elapsed
+        if total >= minimum:
+            break
+    return best
+
+
+def crossovers(limits, timings):
+    """Determine fastest engine from each calibrated limit on."""
+    result = []
+    for i, limit in enumerate(limits):
+        times = {name: values[i] for name, values in timings.items()
+                 if values[i] is not None}
+        fastest = min(times, key=times.get)
+        if not result or result[-1][1] != fastest:
+            result.append([0 if not result else limit, fastest])
+    return result
+
+
+def calibrate(path, max_limit=10**7, verbosity=0):
+    """Time available engines on this host and write profile to path."""
+    limits = []
+    limit = 10
+    while limit <= max_limit:
+        limits.append(limit)
+        limit *= 10
+    names = available_engines()
+    timings = {name: [] for name in names}
+    for limit in limits:
+        for name in names:
+            previous = timings[name][-1] if timings[name] else 0
+            if previous is None or previous > time_cap:
+                timings[name].append(None)
+                continue
+            timings[name].append(time_engine(name, limit))
+            if verbosity >= 1:
+                print('[calibrate] {:<12} limit {:>12}: {:.6f} '
+                      'seconds'.format(name, limit, timings[name][-1]))
+    profile = {
+        'host': platform.node(),
+        'cpus': multiprocessing.cpu_count(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'limits': limits,
+        'timings': timings,
+        'crossovers': crossovers(limits, timings),
+        }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump(profile, f, indent=2)
+    if verbosity >= 0:
+        for start, name in profile['crossovers']:
+            print('[calibrate] From limit {:>12} on: {}'.format(start, name))
+        print('[calibrate] Profile written to \'{}\'.'.format(path))
+    return profile
+
+
+def load_profile(path):
+    """Load calibration profile (None if not available)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def ranking(profile, limit):
+    """Rank engines for limit, fastest first."""
+    table = default_crossovers
+    times = {}
+    if profile is not None:
+        table = profile['crossovers']
+        # Timings at the calibrated limit nearest on a logarithmic scale
+        limits = profile['limits']
+        nearest = min(range(len(limits)), key=lambda k: abs(
+            math.log10(limits[k]) - math.log10(max(limit, 1))))
+        times = {name: values[nearest]
+                 for name, values in profile['timings'].items()
+                 if name in engines and values[nearest] is not None}
+    fastest = [name for start, name in table if start <= limit][-1]
+    order = [fastest] + sorted((name for name in times if name != fastest),
+                               key=times.get)
+    return order + [name for name in available_engines()
+                    if name not in order]
+
+
+def select_engine(profile, limit, max_memory=None, no_primes=False,
+                  mode='memory', time_limit=None):
+    """Select fastest engine for limit that fits into memory budget."""
+    order = ranking(profile, limit)
+    if mode == 'storage':
+        order = [name for name in order
+                 if engines[name]['sievemethod'] in fn.storage_methods]
+    if time_limit is not None:
+        order = [name for name in order
+                 if engines[name]['sievemethod'] in fn.deadline_methods]
+    if max_memory is None:
+        return order[0]
+    for name in order:
+        result, state = fn.estimate_memory(engines[name]['sievemethod'],
+                                           limit, mode, 2**20, no_primes,
+                                           engines[name].get('threads', 1))
+        if result + state <= max_memory:
+            return name
+    # Nothing fits in memory mode: use fastest engine that can spill
+    for name in order:
+        if engines[name]['sievemethod'] in fn.storage_methods:
+            return name
+    return order[0]
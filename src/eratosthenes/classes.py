@@ -3,6 +3,11 @@
 """Collection of classes."""
 
 
+import itertools
+try:
+    import numpy as np
+except ImportError:             # pure-Python engines work without NumPy
+    np = None
 import sieves as sv
 
 
@@ -73,6 +78,19 @@ class SieveMethod(object):
             'primality.'
         elif name == 'all':
             self.description = 'Check all integer numbers for primality.'
+        elif name == 'bytearray':
+            self.description = ('Odd-only sieve of Eratosthenes on a '
+                                'bytearray (standard library only).')
+        elif name == 'divisors':
+            self.description = ('Compute arithmetic functions (number of '
+                                'divisors, phi, mu, sigma, omega) of all '
+                                'integer numbers with a linear sieve.')
+        elif name == 'spf':
+            self.description = ('Build a memory-mappable table of the '
+                                'smallest prime factor of every integer.')
+        elif name == 'bitmap':
+            self.description = ('Segmented sieve of odd integer numbers '
+                                'into a bit-packed prime bitmap.')
 
     def show_description(self):
         """Show description."""
@@ -87,6 +105,12 @@ class SieveMethod(object):
             self.iterations = limit + 1
         elif self.name == 'odd':
             self.iterations = limit + 1 // 2
+        elif self.name == 'bitmap':
+            self.iterations = max((limit + 1) // 2, 1)
+        elif self.name == 'divisors':
+            self.iterations = max(limit, 1)
+        elif self.name == 'bytearray':
+            self.iterations = max((int(max(limit, 0) ** 0.5) - 1) // 2, 1)
         else:
             self.iterations = 0
         return self.iterations
@@ -97,7 +121,10 @@ class Settings(object):
 
     def __init__(self, divisormethod, sievemethod, version, limit_specified,
                  iterations, progress_bar_active, mode, keep, auto_filename,
-                 path, outfile, temp_ext):
+                 path, outfile, temp_ext, passes=(), no_primes=False,
+                 functions=('divisors',), max_memory=None,
+                 segment_size=2**20, jobs=1, time_limit=None,
+                 file_format='text', compress=None, threads=1):
         self.divisormethod = divisormethod
         self.sievemethod = sievemethod
         self.version = version
@@ -109,7 +136,17 @@ class Settings(object):
         self.auto_filename = auto_filename
         self.path = path
         self.outfile = outfile
-        self.tempfile = outfile + temp_ext
+        self.tempfile = (outfile or 'Eratosthenes') + temp_ext
+        self.passes = passes
+        self.no_primes = no_primes
+        self.functions = functions
+        self.max_memory = max_memory
+        self.segment_size = segment_size
+        self.jobs = jobs
+        self.time_limit = time_limit
+        self.file_format = file_format
+        self.compress = compress
+        self.threads = threads
 
     def description(self):
         """Define description."""
@@ -122,7 +159,18 @@ class Settings(object):
             '{}'.format(self.progress_bar_active),
             '[settings] Write data on-the-fly to: \'{}\''.format(self.mode),
             '[settings] Generate output filename automatically: '
-            '\'{}\''.format(self.auto_filename)
+            '\'{}\''.format(self.auto_filename),
+            '[settings] Streaming passes: '
+            '{}'.format([item.title for item in self.passes]),
+            '[settings] Keep prime numbers: {}'.format(not self.no_primes),
+            '[settings] Memory budget: {} bytes'.format(self.max_memory),
+            '[settings] Segment size: {}'.format(self.segment_size),
+            '[settings] Parallel jobs: {}'.format(self.jobs),
+            '[settings] Threads: {}'.format(self.threads),
+            '[settings] Time limit: {} seconds'.format(self.time_limit),
+            '[settings] Output format: \'{}\''.format(self.file_format),
+            '[settings] Output compression: '
+            '\'{}\''.format(self.compress or 'none')
             ]
         if self.auto_filename is False:
             settings.append('[settings] Specified output filename: '
@@ -160,11 +208,47 @@ class Result(object):
     """Define result class."""
 
     def __init__(self, last_iter, percentage_completed, limit_actual,
-                 elapsed_time, interrupt, primes):
+                 elapsed_time, interrupt, primes, num_primes=None):
         self.last_iter = last_iter
         self.percentage_completed = percentage_completed
         self.limit_actual = limit_actual
-        self.num_primes = len(primes)
+        self.num_primes = len(primes) if num_primes is None else num_primes
         self.elapsed_time = elapsed_time
         self.interrupt = interrupt
         self.primes = primes
+        self.peak_memory = None
+
+
+class StoredPrimes(object):
+    """Define prime list read lazily from a temporary file (one per line)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.length = None
+
+    def iter_chunks(self, chunk_size=2**16):
+        """Iterate over primes as NumPy arrays of consecutive primes."""
+        with open(self.path, 'r', encoding='UTF-8') as f:
+            while True:
+                lines = list(itertools.islice(f, chunk_size))
+                if not lines:
+                    break
+                if np is None:
+                    yield [int(line) for line in lines]
+                else:
+                    yield np.array(lines).astype(np.int64)
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='UTF-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    def __len__(self):
+        if self.length is None:
+            with open(self.path, 'rb') as f:
+                self.length = sum(chunk.count(b'\n') for chunk in
+                                  iter(lambda: f.read(2**20), b''))
+        return self.length
+
+    def __repr__(self):
+        return 'StoredPrimes(\'{}\')'.format(self.path)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Adaptive chunk sizing for runs with a time budget."""
+
+import time
+
+
+class Deadline(object):
+    """Define wall-clock deadline that sizes the next chunk of work.
+
+    The processing rate of the previous chunk predicts how many items fit
+    into the remaining time. Chunks take at most `target` seconds, are at
+    most 4 times larger than the last measured chunk and are only started
+    if they are predicted to finish before the deadline.
+    """
+
+    def __init__(self, time_limit, initial_size, granularity=1,
+                 maximum=None, target=1.0, safety=0.8):
+        self.time_limit = time_limit
+        self.maximum = maximum
+        self.end = time.perf_counter() + time_limit
+        self.granularity = granularity
+        self.size = max(initial_size // granularity, 1) * granularity
+        self.target = target
+        self.safety = safety
+        self.rate = None
+        self.measured = self.size
+        self.reached = False
+
+    def remaining(self):
+        """Return remaining time in seconds."""
+        return self.end - time.perf_counter()
+
+    def next_size(self):
+        """Return size of next chunk (0 if no chunk fits anymore)."""
+        remaining = self.remaining()
+        if remaining > 0 and self.rate is not None:
+            size = self.rate * min(self.safety * remaining, self.target)
+            size = min(int(size), 4 * self.measured, self.maximum or size)
+            self.size = size // self.granularity * self.granularity
+        elif remaining <= 0:
+            self.size = 0
+        if self.size == 0:
+            self.reached = True
+        return self.size
+
+    def record(self, items, seconds):
+        """Record processing time of a finished chunk."""
+        self.rate = items / max(seconds, 1e-6)
+        self.measured = items
+
+    def fits(self, items, workers=1):
+        """Check if items are predicted to be processed in time by workers."""
+        return (self.rate is None or
+                items <= self.rate * workers * self.safety * self.remaining())
+
+
+def chunk_bounds(start, end, chunk_size, deadline=None, timed=True):
+    """Yield consecutive chunks [lo, hi) of range(start, end).
+
+    With a deadline, chunk sizes adapt to the measured processing time
+    (the time between two yields, unless timed=False and the consumer
+    records it) and iteration stops at the last chunk boundary that fits
+    into the time budget.
+    """
+    lo = start
+    while lo < end:
+        size = chunk_size if deadline is None else deadline.next_size()
+        if size == 0:
+            return
+        hi = min(lo + size, end)
+        begin = time.perf_counter()
+        yield lo, hi
+        if deadline is not None and timed:
+            deadline.record(hi - lo, time.perf_counter() - begin)
+        lo = hi
+
+
+def report(deadline, last_iter, end, limit_actual):
+    """Print summary of a run stopped by its deadline."""
+    print('[Deadline] Time limit of {} seconds reached at iteration '
+          '{} of {} ({:6.2f}%).'.format(deadline.time_limit, last_iter, end,
+                                        last_iter / end * 100))
+    print('[Deadline] Actually tested integer range is [0, '
+          '{}].'.format(limit_actual))
@@ -7,6 +7,10 @@ import argparse
 import time
 import functions as fn
 import classes
+import calibrate
+import fingerprint
+import progress
+from primestore import PrimeStore
 
 # Define version string
 version_num = '0.31'
@@ -31,10 +35,14 @@ def main():
                         help=('disable terminal output (terminates all '
                               'verbosity)'))
     parser.add_argument('-p', '--progress', action='store_true',
-                        help=('show progress bar'))
+                        help=('show progress line with throughput and ETA'))
+    parser.add_argument('--progress-fd', dest='progress_fd', type=int,
+                        metavar='FD', help='write machine-readable progress '
+                        'lines (JSON) to file descriptor FD')
     parser.add_argument('-s', '--sievemethod', dest='sievemethod',
                         choices=('all', 'odd', '3k', '4k', '6k', 'list',
-                                 'list-np', 'divisors'),
+                                 'list-np', 'divisors', 'bitmap', 'spf',
+                                 'bytearray', 'auto'),
                         default='6k', help='sieve method (default: 6k)')
     parser.add_argument('-d', '--divisormethod', choices=('all', 'sqrt', 'odd',
                                                           'sqrt-odd'),
@@ -53,9 +61,65 @@ def main():
                         choices=('always', 'never', 'interrupt'),
                         default='interrupt', help='keep mode for temporary '
                         'file (storage mode only)')
-    parser.add_argument('limit', type=int, default=100,
+    parser.add_argument('-F', '--format', choices=('text', 'packed'),
+                        default='text', help='output file format '
+                        '(text=one prime per line, packed=delta-varint '
+                        'encoded blocks; default: text)')
+    parser.add_argument('-z', '--compress', choices=('gzip', 'lzma'),
+                        help='compress output file')
+    parser.add_argument('-A', '--analytics', action='store_true',
+                        help='report prime gaps, record gaps and prime '
+                        'constellations in the result header')
+    parser.add_argument('-n', '--no-primes', dest='no_primes',
+                        action='store_true',
+                        help='do not keep or write the prime numbers '
+                        '(implies --analytics)')
+    parser.add_argument('-f', '--functions', type=fn.function_list,
+                        default=['divisors'],
+                        help='comma-separated arithmetic functions computed '
+                        'by sieve method divisors, any of divisors, phi, '
+                        'mu, sigma, omega (default: divisors)')
+    parser.add_argument('-M', '--max-memory', dest='max_memory',
+                        type=fn.parse_size,
+                        help='memory budget in bytes (suffixes K, M, G, T); '
+                        'selects writing mode and segment size '
+                        'automatically')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes for the trial '
+                        'division methods all, odd, 3k, 4k, 6k (0 = number '
+                        'of CPUs, default: 1)')
+    parser.add_argument('-T', '--threads', type=int, default=1,
+                        help='number of threads sifting segments of sieve '
+                        'method bitmap (0 = number of CPUs, default: 1)')
+    parser.add_argument('-t', '--time-limit', dest='time_limit',
+                        type=float, metavar='SECONDS',
+                        help='sieve as far as possible within SECONDS and '
+                        'report the actually tested integer range (sieve '
+                        'methods all, odd, 3k, 4k, 6k, bitmap)')
+    parser.add_argument('--calibrate', nargs='?', type=int, const=10**7,
+                        metavar='MAX', help='time the available engines '
+                        'for limits up to MAX (default: 10000000) and save '
+                        'the calibration profile used by sieve method auto')
+    parser.add_argument('--profile', default=calibrate.default_path(),
+                        help='calibration profile (default: '
+                        '%(default)s)')
+    parser.add_argument('--verify', metavar='FILE',
+                        help='recompute the stream fingerprint of the primes '
+                        'in FILE and compare it to the recorded one')
+    parser.add_argument('--lower', type=int, default=0,
+                        help='lower limit of sharded range (default: 0)')
+    parser.add_argument('--make-shards', dest='make_shards', type=int,
+                        metavar='N', help='split [lower, limit] into N '
+                        'shards and write manifest to MANIFEST')
+    parser.add_argument('--shard', type=int, metavar='K',
+                        help='run shard K of MANIFEST')
+    parser.add_argument('--merge', nargs='?', const='', metavar='OUTFILE',
+                        help='validate shards of MANIFEST and concatenate '
+                        'them to OUTFILE (sum counts only without OUTFILE)')
+    parser.add_argument('--manifest', help='shard manifest file')
+    parser.add_argument('limit', type=int, nargs='?', default=100,
                         help='upper limit of test range (a non-negative '
-                        'integer)')
+                        'integer, default: 100)')
     parser.add_argument('outfile', nargs='?', help='write to file \'outfile\'')
 
     args = parser.parse_args()
@@ -67,6 +131,143 @@ def main():
     if verbosity >= 1:
         print(args)
 
+    # Without NumPy, only the pure-Python engines with text output run
+    if fn.np is None and (args.sievemethod not in fn.pure_methods or
+                          args.format == 'packed' or args.analytics or
+                          args.no_primes or args.verify is not None or
+                          args.calibrate is not None or
+                          args.make_shards is not None or
+                          args.shard is not None or args.merge is not None):
+        parser.error('NumPy is not available (use sieve methods {} with '
+                     'text output)'.format(', '.join(fn.pure_methods)))
+
+    # Write progress lines for job schedulers
+    if args.progress_fd is not None:
+        progress.open_telemetry(args.progress_fd)
+
+    # Verify fingerprint of existing output file
+    if args.verify is not None:
+        try:
+            recorded, computed = fingerprint.verify(args.verify)
+        except OSError as error:
+            parser.error(str(error))
+        mismatch = [key for key in computed
+                    if recorded.get(key) != computed[key]]
+        if verbosity >= 1:
+            for key in computed:
+                print('[verify] {:<12} recorded {:<34} computed '
+                      '{}'.format(key, recorded.get(key, '-'),
+                                  computed[key]))
+        if 'fingerprint' not in recorded:
+            print('[verify] \'{}\' has no recorded '
+                  'fingerprint.'.format(args.verify))
+            parser.exit(1)
+        if computed['count'] == '0' and recorded.get('count') != '0':
+            print('[verify] \'{}\' contains no prime numbers to '
+                  'verify.'.format(args.verify))
+            parser.exit(1)
+        if mismatch:
+            print('[verify] \'{}\' does not match its fingerprint '
+                  '({}).'.format(args.verify, ', '.join(mismatch)))
+            parser.exit(1)
+        if verbosity >= 0:
+            print('[verify] \'{}\' matches its fingerprint '
+                  '({} prime numbers).'.format(args.verify,
+                                              computed['count']))
+        return
+
+    # Calibrate engines on this host
+    if args.calibrate is not None:
+        calibrate.calibrate(args.profile, args.calibrate, verbosity)
+        return
+
+    # Select fastest engine from calibration profile
+    if args.sievemethod == 'auto':
+        if args.jobs != 1 or args.threads != 1:
+            parser.error('sieve method \'auto\' selects --jobs and '
+                         '--threads itself')
+        profile = calibrate.load_profile(args.profile)
+        if profile is None and verbosity >= 1:
+            print('[auto] No calibration profile \'{}\' found. Using default '
+                  'crossovers.'.format(args.profile))
+        engine = calibrate.select_engine(profile, args.limit, args.max_memory,
+                                         args.no_primes, args.mode,
+                                         args.time_limit)
+        args.sievemethod = calibrate.engines[engine]['sievemethod']
+        args.divisormethod = calibrate.engines[engine]['divisormethod']
+        args.jobs = calibrate.engines[engine]['jobs']
+        args.threads = calibrate.engines[engine].get('threads', 1)
+        if verbosity >= 1:
+            print('[auto] Selected engine \'{}\' for limit '
+                  '{}.'.format(engine, args.limit))
+
+    # Sharded runs (manifest, single shard, merge)
+    if (args.make_shards is not None or args.shard is not None or
+            args.merge is not None):
+        import shards           # requires NumPy
+        if args.manifest is None:
+            parser.error('sharded runs require --manifest')
+        if args.make_shards is not None:
+            try:
+                manifest = shards.make_manifest(args.lower, args.limit,
+                                                args.make_shards,
+                                                args.manifest)
+            except (OSError, ValueError) as error:
+                parser.error(str(error))
+            if verbosity >= 0:
+                print('[shard] Wrote manifest \'{}\' with {} shards for '
+                      '[{}, {}].'.format(args.manifest,
+                                         len(manifest['shards']),
+                                         args.lower, args.limit))
+        if args.shard is not None:
+            try:
+                count, checksum = shards.run_shard(args.manifest, args.shard)
+            except (OSError, ValueError) as error:
+                parser.error(str(error))
+            if verbosity >= 0:
+                print('[shard] Shard {}: {} prime numbers (sha256 '
+                      '{}).'.format(args.shard, count, checksum))
+        if args.merge is not None:
+            try:
+                total = shards.merge(args.manifest, args.merge or None,
+                                     verbosity)
+            except OSError as error:
+                parser.error(str(error))
+            if total is None:
+                parser.exit(1)
+        return
+
+    if args.format == 'packed' and args.sievemethod in ('divisors', 'spf'):
+        parser.error('sieve method \'{}\' does not support --format '
+                     'packed'.format(args.sievemethod))
+    if ((args.analytics or args.no_primes) and
+            args.sievemethod in ('divisors', 'spf')):
+        parser.error('sieve method \'{}\' does not support --analytics and '
+                     '--no-primes'.format(args.sievemethod))
+    if args.sievemethod == 'spf' and args.limit > fn.spf_max_limit:
+        parser.error('sieve method \'spf\' supports limits up to '
+                     '{}'.format(fn.spf_max_limit))
+    if (args.mode == 'storage' and
+            args.sievemethod not in fn.storage_methods + ('spf',)):
+        parser.error('sieve method \'{}\' does not support storage '
+                     'mode'.format(args.sievemethod))
+    if args.jobs < 0:
+        parser.error('number of jobs must not be negative')
+    if args.jobs != 1 and args.sievemethod not in fn.trial_methods:
+        parser.error('sieve method \'{}\' does not support '
+                     '--jobs'.format(args.sievemethod))
+    if args.threads < 0:
+        parser.error('number of threads must not be negative')
+    if args.threads != 1 and args.sievemethod not in fn.threaded_methods:
+        parser.error('sieve method \'{}\' does not support '
+                     '--threads'.format(args.sievemethod))
+    if args.time_limit is not None and args.time_limit <= 0:
+        parser.error('time limit must be positive')
+    if (args.time_limit is not None and
+            args.sievemethod not in fn.deadline_methods):
+        parser.error('sieve method \'{}\' does not support '
+                     '--time-limit'.format(args.sievemethod))
+
     # Define file extension for temporary file
     temp_ext = '.temp'
     # Translate progress option
@@ -77,10 +278,34 @@ def main():
     # Create sieve-method object
     sieve_method = classes.SieveMethod(args.sievemethod)
     # divisorfunc = fn.select_divisormethod(args)
-    # Generate automatic filename
-    path, outfile = fn.auto_filename(args, verbosity)
     # Make limit integer
     limit_specified = int(args.limit)
+    # Select writing mode and segment size within memory budget
+    segment_size = 2**20
+    if args.max_memory is not None:
+        args.mode, segment_size = fn.plan_memory(args.sievemethod,
+                                                 limit_specified,
+                                                 args.max_memory,
+                                                 args.mode,
+                                                 args.no_primes,
+                                                 verbosity,
+                                                 args.threads,
+                                                 args.functions)
+    # Generate automatic filename
+    path, outfile = fn.auto_filename(args, verbosity)
+    # Create streaming passes (fingerprint for output header, compressed
+    # store, analytics)
+    passes = []
+    if outfile is not None:
+        passes.append(fingerprint.StreamFingerprint())
+    store = None
+    if (args.format == 'packed' and args.mode == 'memory' and
+            args.no_primes is False):
+        store = PrimeStore()
+        passes.append(store)
+    if args.analytics is True or args.no_primes is True:
+        from analytics import PrimeAnalytics    # requires NumPy
+        passes.append(PrimeAnalytics())
     # Define settings object
     settings = classes.Settings(divisor_method.name,
                                 sieve_method.name,
@@ -93,9 +318,23 @@ def main():
                                 args.autoname,
                                 path,
                                 outfile,
-                                temp_ext)
+                                temp_ext,
+                                passes,
+                                args.no_primes,
+                                args.functions,
+                                args.max_memory,
+                                segment_size,
+                                args.jobs,
+                                args.time_limit,
+                                args.format,
+                                args.compress,
+                                args.threads)
     if verbosity >= 1:
         settings.show_description()
+    # Build smallest-prime-factor table instead of listing primes
+    if settings.sievemethod == 'spf':
+        fn.build_spf_table(settings, verbosity)
+        return
     # algorithm = classes.Algorithm(args.divisormethod, args.sievemethod)
     # Set interrupt switch to default
     interrupt = False
@@ -103,7 +342,12 @@ def main():
     # if verbosity >= 1:
     #     print()
     # Start timer
-    start = time.process_time()
+    # (wall-clock time with worker processes, whose CPU time is not counted,
+    # and with threads, whose CPU time adds up)
+    timer = time.process_time
+    if settings.jobs != 1 or settings.threads != 1:
+        timer = time.perf_counter
+    start = timer()
     # Check writing mode
     if settings.mode == 'storage':
         # Write to temporary file
@@ -118,16 +362,26 @@ def main():
                                                                                      settings,
                                                                                      verbosity)
     # Stop timer
-    elapsed_time = (time.process_time() - start)
+    elapsed_time = (timer() - start)
     if settings.mode == 'storage':
-        # Read temporary file
-        with open(settings.tempfile, 'r') as f:
-            primes = f.read().splitlines()
+        # Read temporary file lazily
+        primes = classes.StoredPrimes(settings.tempfile)
+    # Feed analytics passes unless the engine did so segment by segment
+    if settings.sievemethod not in fn.segmented_methods + ('divisors',):
+        fn.run_passes(primes, settings.passes)
+    if store is not None:
+        # Keep compressed primes only
+        primes = store
+    num_primes = None
+    if settings.no_primes is True:
+        primes = []
+        num_primes = passes[-1].count
     # Calculate percentage of completed iterations
     percentage_completed = last_iter / settings.iterations * 100
     # Define Result object
     result = classes.Result(last_iter, percentage_completed, limit_actual,
-                            elapsed_time, interrupt, primes)
+                            elapsed_time, interrupt, primes, num_primes)
+    result.peak_memory = fn.peak_memory()
     # Print result if -vv
     if verbosity >= 2:
         print(primes)
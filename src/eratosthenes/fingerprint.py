@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Order-sensitive fingerprint of a stream of primes."""
+
+import array
+import hashlib
+import itertools
+import re
+import sys
+try:
+    import numpy as np
+except ImportError:             # pure-Python engines work without NumPy
+    np = None
+import primestore
+
+
+class StreamFingerprint(object):
+    """Define fingerprint pass fed with consecutive chunks of primes.
+
+    The digest is a BLAKE2b hash of all primes as little-endian 64-bit
+    integers, so it only depends on the primes and their order, not on how
+    the stream was split into chunks. Count, sum and last prime are kept
+    alongside.
+    """
+
+    title = 'Stream fingerprint'
+
+    def __init__(self):
+        self.hash = hashlib.blake2b(digest_size=16)
+        self.count = 0
+        self.sum = 0
+        self.last = None
+
+    def update(self, chunk):
+        """Process next chunk of consecutive primes."""
+        # Little-endian 64-bit integers (no copy on little-endian hosts)
+        if np is None:
+            chunk = array.array('q', chunk)
+            if sys.byteorder == 'big':
+                chunk.byteswap()
+            total = sum(chunk)
+        else:
+            chunk = np.ascontiguousarray(chunk, dtype='<i8')
+            total = int(chunk.sum())
+        if len(chunk) == 0:
+            return
+        self.hash.update(chunk)
+        self.count += len(chunk)
+        self.sum += total
+        self.last = int(chunk[-1])
+
+    def digest(self):
+        """Return hexadecimal digest."""
+        return self.hash.hexdigest()
+
+    def values(self):
+        """Return fingerprint values by key."""
+        return {'fingerprint': self.digest(), 'count': self.count,
+                'sum': self.sum,
+                'last': '-' if self.last is None else self.last}
+
+    def header(self):
+        """Return summary rows for output header."""
+        return [['Fingerprint (BLAKE2b-128)', self.digest()],
+                ['Prime count', self.count],
+                ['Prime sum', self.sum],
+                ['Last prime', '-' if self.last is None else self.last]]
+
+
+# Header rows (output files) and trailer lines (shard files) with
+# recorded fingerprint values
+header_keys = {'Fingerprint (BLAKE2b-128)': 'fingerprint',
+               'Prime count': 'count', 'Prime sum': 'sum',
+               'Last prime': 'last', 'fingerprint:': 'fingerprint',
+               'count:': 'count', 'sum:': 'sum', 'last:': 'last'}
+header_pattern = re.compile(r'^#\s+({})\s+(\S+)\s*$'.format(
+    '|'.join(re.escape(key) for key in header_keys)))
+
+
+def record(line, recorded):
+    """Add fingerprint value of header line to recorded values."""
+    match = header_pattern.match(line)
+    if match:
+        recorded[header_keys[match.group(1)]] = match.group(2)
+
+
+def verify(path, chunk_size=2**16):
+    """Recompute fingerprint of prime file and compare to recorded values.
+
+    Return recorded and computed values. In text files, lines starting with
+    '#' are header lines; all other lines hold one prime each. Packed and
+    compressed files are decoded on the fly.
+    """
+    recorded = {}
+    fingerprint = StreamFingerprint()
+    if primestore.is_packed(path):
+        with primestore.open_file(path, 'rb') as f:
+            for line in primestore.read_header(f).splitlines():
+                record(line, recorded)
+        for chunk in primestore.iter_chunks(path):
+            fingerprint.update(chunk)
+    else:
+        with primestore.open_file(path, 'rt') as f:
+            while True:
+                lines = list(itertools.islice(f, chunk_size))
+                if not lines:
+                    break
+                primes = []
+                for line in lines:
+                    if line.startswith('#'):
+                        record(line, recorded)
+                    elif line.strip():
+                        primes.append(line)
+                if primes:
+                    fingerprint.update(np.array(primes).astype(np.int64))
+    computed = {key: str(value) for key, value in
+                fingerprint.values().items()}
+    return recorded, computed
@@ -2,9 +2,42 @@
 # -*- coding: utf-8 -*-
 """Collection of functions."""
 
+import argparse
 import sieves
 import sieves_storage as sv
+import sieves_parallel
+import sieves_pure
+import primestore
+import math
 import os
+import sys
+import time
+try:
+    import numpy as np
+except ImportError:             # pure-Python engines work without NumPy
+    np = None
+try:
+    import resource
+except ImportError:             # not available on Windows
+    resource = None
+
+
+# Sieve methods that feed streaming passes segment by segment
+segmented_methods = ('bitmap',)
+# Sieve methods checking candidates by trial division
+trial_methods = ('all', 'odd', '3k', '4k', '6k')
+# Sieve methods that work without NumPy
+pure_methods = trial_methods + ('bytearray',)
+# Sieve methods that support a time limit
+deadline_methods = trial_methods + ('bitmap',)
+# Sieve methods with a thread-pool backend
+threaded_methods = ('bitmap',)
+# Sieve methods that can write to storage on the fly
+storage_methods = ('all', 'odd', '3k', '4k', '6k', 'bitmap')
+# Largest limit of smallest-prime-factor table (uint32 entries)
+spf_max_limit = 2**32 - 1
+# Estimated bytes per prime in a Python list (int object and pointer)
+bytes_per_listed_prime = 36
 
 
 def verbosity_level(args):
@@ -15,6 +48,117 @@ def verbosity_level(args):
     return verbosity
 
 
+def function_list(text):
+    """Convert comma-separated list of arithmetic functions."""
+    functions = [name.strip() for name in text.split(',') if name.strip()]
+    for name in functions:
+        if name not in sieves.arithmetic_functions:
+            raise argparse.ArgumentTypeError(
+                'invalid function \'{}\' (choose from {})'.format(
+                    name, ', '.join(sieves.arithmetic_functions)))
+    return functions
+
+
+def parse_size(text):
+    """Convert memory size with optional suffix K, M, G or T to bytes."""
+    units = {'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}
+    text = text.strip().upper().rstrip('B')
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid memory size '
+                                         '\'{}\''.format(text))
+
+
+def estimate_primes(limit):
+    """Estimate upper bound for number of primes up to limit."""
+    if limit < 17:
+        return 6
+    return int(1.25506 * limit / math.log(limit)) + 1
+
+
+def estimate_memory(sievemethod, limit, mode='memory', segment_size=2**20,
+                    no_primes=False, threads=1, functions=('divisors',)):
+    """Estimate memory footprint (result plus sieve state) in bytes."""
+    result = 0
+    state = 0
+    if sievemethod == 'bitmap':
+        # Bool segment, packed segment and primes of segment (as text lines
+        # in storage mode) for every segment in flight, base primes
+        per_prime = 100 if mode == 'storage' else 8
+        in_flight = 1 if threads == 1 else 2 * (threads or os.cpu_count())
+        state = (in_flight * (2 * segment_size + per_prime *
+                              estimate_primes(2 * segment_size)) +
+                 8 * estimate_primes(int(math.sqrt(limit))))
+        if mode == 'memory' and no_primes is False:
+            # Packed bitmap plus rank index (8 bytes per 64-byte block)
+            result = limit // 16 + limit // 16 // 8
+    elif sievemethod in ('all', 'odd', '3k', '4k', '6k'):
+        if mode == 'memory':
+            result = bytes_per_listed_prime * estimate_primes(limit)
+    elif sievemethod == 'bytearray':
+        state = limit // 2
+        result = bytes_per_listed_prime * estimate_primes(limit)
+    elif sievemethod == 'divisors':
+        # Smallest prime factors and their powers (int64), listed primes
+        state = 16 * (limit + 1) + bytes_per_listed_prime * \
+            estimate_primes(limit)
+        # Table of int64 columns: number and one column per function
+        result = 8 * (len(functions) + 1) * (limit + 1)
+    elif sievemethod == 'spf':
+        state = limit + 1
+    else:
+        result = 8 * limit
+    return result, state
+
+
+def peak_memory():
+    """Determine peak resident memory of process in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def plan_memory(sievemethod, limit, max_memory, mode, no_primes, verbosity,
+                threads=1, functions=('divisors',)):
+    """Select writing mode and segment size within memory budget."""
+    # Memory already in use (interpreter, modules) counts against budget;
+    # keep a margin for temporaries not covered by the estimate
+    available = int(0.9 * (max_memory - (peak_memory() or 0)))
+    segment_size = 2**20
+    result, state = estimate_memory(sievemethod, limit, mode, segment_size,
+                                    no_primes, threads, functions)
+    if (result + state > available and mode == 'memory' and
+            sievemethod in storage_methods):
+        mode = 'storage'
+        result, state = estimate_memory(sievemethod, limit, mode,
+                                        segment_size, no_primes, threads)
+    if sievemethod == 'bitmap':
+        # Largest power-of-two segment that fits next to the result
+        segment_size = 2**25
+        while segment_size > 2**13:
+            segment_size //= 2
+            result, state = estimate_memory(sievemethod, limit, mode,
+                                            segment_size, no_primes, threads)
+            if result + state <= available:
+                break
+    if verbosity >= 1:
+        print('[memory] Budget {} bytes, available {} bytes.'.format(
+            max_memory, available))
+        print('[memory] Estimated footprint {} bytes (result {}, sieve state '
+              '{}).'.format(result + state, result, state))
+        print('[memory] Selected mode \'{}\' with segment size '
+              '{}.'.format(mode, segment_size))
+    if result + state > available and verbosity >= 0:
+        print('[memory] Warning: estimated footprint of {} bytes exceeds '
+              'memory budget.'.format(result + state))
+    return mode, segment_size
+
+
 def select_divisormethod(args):
     """Select specified divisor method."""
     if args.divisormethod == 'all':
@@ -31,7 +175,15 @@ def select_divisormethod(args):
 def select_algorithm_memory_mode(divisor_method, sieve_method, settings,
                                  verbosity):
     """Select specified algorithm."""
-    if settings.sievemethod == 'all':
+    if ((settings.jobs != 1 or settings.time_limit is not None) and
+            settings.sievemethod in trial_methods):
+        result_code = sieves_parallel.alg_parallel(sieve_method,
+                                                   divisor_method.function,
+                                                   settings.limit_specified,
+                                                   settings.jobs,
+                                                   settings.progress_bar_active,
+                                                   time_limit=settings.time_limit)
+    elif settings.sievemethod == 'all':
         result_code = sieves.alg_all(divisor_method.function,
                                      settings.limit_specified,
                                      settings.progress_bar_active)
@@ -51,15 +203,38 @@ def select_algorithm_memory_mode(divisor_method, sieve_method, settings,
         result_code = sieves.alg_multiples_all_np(settings.limit_specified,
                                                   settings.progress_bar_active)
     elif settings.sievemethod == 'divisors':
-        result_code = sieves.numdivisors(settings.limit_specified,
-                                         settings.progress_bar_active)
+        result_code = sieves.multiplicative(settings.limit_specified,
+                                            settings.functions,
+                                            settings.progress_bar_active)
+    elif settings.sievemethod == 'bytearray':
+        result_code = sieves_pure.alg_bytearray(settings.limit_specified,
+                                                settings.progress_bar_active)
+    elif settings.sievemethod == 'bitmap':
+        result_code = sieves.alg_bitmap(settings.limit_specified,
+                                        settings.progress_bar_active,
+                                        settings.segment_size,
+                                        passes=settings.passes,
+                                        store=(not settings.no_primes and
+                                               settings.file_format ==
+                                               'text'),
+                                        time_limit=settings.time_limit,
+                                        threads=settings.threads)
     return result_code
 
 
 def select_algorithm_storage_mode(divisor_method, sieve_method, settings,
                                   verbosity):
     """Select specified algorithm."""
-    if settings.sievemethod == 'all':
+    if ((settings.jobs != 1 or settings.time_limit is not None) and
+            settings.sievemethod in trial_methods):
+        result_code = sv.alg_parallel(sieve_method,
+                                      divisor_method.function,
+                                      settings.limit_specified,
+                                      settings.tempfile,
+                                      settings.jobs,
+                                      settings.progress_bar_active,
+                                      time_limit=settings.time_limit)
+    elif settings.sievemethod == 'all':
         result_code = sv.alg_all(divisor_method.function,
                                  settings.limit_specified,
                                  settings.tempfile,
@@ -75,21 +250,73 @@ def select_algorithm_storage_mode(divisor_method, sieve_method, settings,
                                 settings.limit_specified,
                                 settings.tempfile,
                                 settings.progress_bar_active)
+    elif settings.sievemethod == 'bitmap':
+        result_code = sv.alg_bitmap(settings.limit_specified,
+                                    settings.tempfile,
+                                    settings.progress_bar_active,
+                                    settings.segment_size,
+                                    passes=settings.passes,
+                                    time_limit=settings.time_limit,
+                                    threads=settings.threads)
     return result_code
 
 
+def prime_chunks(primes, chunk_size=2**16):
+    """Iterate over prime list as NumPy arrays of consecutive primes."""
+    if hasattr(primes, 'iter_chunks'):
+        return primes.iter_chunks()
+    if np is None:
+        return (list(primes[i:i + chunk_size])
+                for i in range(0, len(primes), chunk_size))
+    return (np.asarray(primes[i:i + chunk_size]).astype(np.int64)
+            for i in range(0, len(primes), chunk_size))
+
+
+def run_passes(primes, passes, chunk_size=2**16):
+    """Feed streaming passes with chunks of a completed prime list."""
+    if not passes:
+        return
+    for chunk in prime_chunks(primes, chunk_size):
+        for item in passes:
+            item.update(chunk)
+
+
+def build_spf_table(settings, verbosity):
+    """Build smallest-prime-factor table file."""
+    import spf                  # requires NumPy
+    if settings.outfile is None:
+        print('[spf] No output file specified. Table not built.')
+        return
+    start = time.process_time()
+    spf.build_spf(settings.limit_specified, settings.outfile,
+                  settings.progress_bar_active)
+    elapsed_time = time.process_time() - start
+    if verbosity >= 0:
+        print('[spf] Wrote smallest-prime-factor table for [0, {}] to \'{}\' '
+              'in {:.9f} seconds.'.format(settings.limit_specified,
+                                          settings.outfile, elapsed_time))
+
+
 def auto_filename(args, verbosity):
     """Generate auto filename."""
     # If autoname option is not used, take outfile argument,
     # else generate auto filename
-    path = os.path.dirname(args.outfile)
+    path = os.path.dirname(args.outfile or '')
     if args.autoname is False:
         outfile = args.outfile
     else:
-        filename = 'Eratosthenes_{}_{}_{}_{}.dat'.format(args.limit,
-                                                         args.sievemethod,
-                                                         args.divisormethod,
-                                                         args.mode)
+        if args.sievemethod == 'spf':
+            extension = 'npy'
+        elif args.format == 'packed':
+            extension = 'primes'
+        else:
+            extension = 'dat'
+        extension += {'gzip': '.gz', 'lzma': '.xz'}.get(args.compress, '')
+        filename = 'Eratosthenes_{}_{}_{}_{}.{}'.format(args.limit,
+                                                        args.sievemethod,
+                                                        args.divisormethod,
+                                                        args.mode,
+                                                        extension)
         outfile = os.path.join(path, filename)
     if verbosity >= 1:
         if args.outfile is None:
@@ -112,7 +339,9 @@ def output(divisor_method, sieve_method, settings, result, verbosity):
             ['Sieve method', sieve_method.name],
             ['Divisors method', divisor_method.name],
             ['Progress bar active', '{}'.format(settings.progress_bar_active)],
-            ['On-the-fly writing mode', settings.mode]
+            ['On-the-fly writing mode', settings.mode],
+            ['Output format', settings.file_format],
+            ['Output compression', settings.compress or 'none']
             ]
         header_result = [
             ['Interrupt exception event', '{}'.format(result.interrupt)],
@@ -125,42 +354,79 @@ def output(divisor_method, sieve_method, settings, result, verbosity):
             ['Detected prime numbers', result.num_primes],
             ['Sifting time', '{:.9f} seconds'.format(result.elapsed_time)],
             ]
+        if result.peak_memory is not None:
+            header_result.append(['Peak memory',
+                                  '{} bytes'.format(result.peak_memory)])
+        header_passes = [(item.title, item.header())
+                         for item in settings.passes]
         if verbosity >= 0:
             print('[result] Detected {} prime numbers in {:.9f} '
                   'seconds.'.format(result.num_primes, result.elapsed_time))
+        if verbosity >= 1 and result.peak_memory is not None:
+            print('[memory] Peak memory: {} bytes ({:.1f} MiB).'.format(
+                result.peak_memory, result.peak_memory / 2**20))
+        if verbosity >= 1:
+            for title, rows in header_passes:
+                for item in rows:
+                    print('[{}] {}: {}'.format(title, item[0], item[1]))
         if settings.outfile is not None:
-            with open(settings.outfile, 'w', encoding='UTF-8') as f:
-                f.write(header_top)
-                f.write('#   [Specified settings]\n')
-                for item in header_settings:
-                    f.write('#   {:<31} {:<31}\n'.format(item[0], item[1]))
-                f.write('# {}\n'.format('─' * (len(header_top) - 3)))
-                f.write('#   [Result summary]\n')
-                for item in header_result:
-                    f.write('#   {:<31} {:<31}\n'.format(item[0], item[1]))
-                f.write(header_closing)
-                for i in range(result.num_primes):
-                    f.write('{}\n'.format(result.primes[i]))
+            header = [header_top, '#   [Specified settings]\n']
+            for item in header_settings:
+                header.append('#   {:<31} {:<31}\n'.format(item[0], item[1]))
+            header.append('# {}\n'.format('─' * (len(header_top) - 3)))
+            header.append('#   [Result summary]\n')
+            for item in header_result:
+                header.append('#   {:<31} {:<31}\n'.format(item[0], item[1]))
+            for title, rows in header_passes:
+                header.append('# {}\n'.format('─' * (len(header_top) - 3)))
+                header.append('#   [{}]\n'.format(title))
+                for item in rows:
+                    header.append('#   {:<31} {:<31}\n'.format(item[0],
+                                                               item[1]))
+            header.append(header_closing)
+            if settings.file_format == 'packed':
+                primestore.write(settings.outfile, ''.join(header),
+                                 prime_chunks(result.primes),
+                                 settings.compress)
+            else:
+                with primestore.open_file(settings.outfile, 'wt',
+                                          settings.compress) as f:
+                    f.write(''.join(header))
+                    for prime in result.primes:
+                        f.write('{}\n'.format(prime))
     else:
         header = [
-            ['Integer range', '[0, {}]'.format(settings.limit)],
-            ['Applied divisors method', divisor_method.name],
+            ['Integer range', '[1, {}]'.format(settings.limit_specified)],
+            ['Arithmetic functions', ', '.join(settings.functions)],
             ['Progress bar active', '{}'.format(settings.progress_bar_active)],
+            ['Interrupt exception event', '{}'.format(result.interrupt)],
+            ['Actually tested integer range',
+             '[1, {}]'.format(result.limit_actual)],
             ['Time', '{:.9f} seconds'.format(result.elapsed_time)],
             ]
+        if result.peak_memory is not None:
+            header.append(['Peak memory',
+                           '{} bytes'.format(result.peak_memory)])
         if verbosity >= 0:
-            print('Created divisor list in the rage [1, {}] in {:.9f} '
-                  'seconds'.format(result.limit, result.elapsed_time))
+            print('[result] Computed {} in the range [1, {}] in {:.9f} '
+                  'seconds.'.format(', '.join(settings.functions),
+                                    result.limit_actual,
+                                    result.elapsed_time))
+        if verbosity >= 1 and result.peak_memory is not None:
+            print('[memory] Peak memory: {} bytes ({:.1f} MiB).'.format(
+                result.peak_memory, result.peak_memory / 2**20))
         if settings.outfile is not None:
-            with open(settings.outfile, 'w', encoding='UTF-8') as f:
+            columns = ['Number'] + [name.capitalize()
+                                    for name in settings.functions]
+            with primestore.open_file(settings.outfile, 'wt',
+                                      settings.compress) as f:
                 f.write(header_top)
                 for item in header:
                     f.write('#  {:<31} {:<31}\n'.format(item[0], item[1]))
                 f.write(header_closing)
-                f.write('#  Number\tDivisors\n')
-                for i in range(result.num_primes):
-                    f.write('{}\t{}\n'.format(result.primes[i][0],
-                                              result.primes[i][1]))
+                f.write('#  {}\n'.format('\t'.join(columns)))
+                for row in result.primes:
+                    f.write('{}\n'.format('\t'.join(map(str, row.tolist()))))
     if settings.mode == 'storage':
         # Check keep mode and treat temporary file as specified
         if verbosity >= 1:
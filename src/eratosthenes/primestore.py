@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Delta-varint compressed prime store (in memory and on disk)."""
+
+import gzip
+import io
+import lzma
+import struct
+try:
+    import numpy as np
+except ImportError:             # only needed for the packed format
+    np = None
+
+
+# Packed file: magic, header length and text header, then blocks
+MAGIC = b'ERAPACK1'
+# Block header: first prime, number of primes, payload bytes
+BLOCK = struct.Struct('<qII')
+# Leading bytes of the supported compression formats
+COMPRESSION_MAGIC = {'gzip': b'\x1f\x8b', 'lzma': b'\xfd7zXZ\x00'}
+
+
+def encode_varint(values):
+    """Encode unsigned integers as little-endian base-128 varints."""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0 or int(values.max()) < 0x80:
+        return values.astype(np.uint8).tobytes()
+    nbytes = np.ones(len(values), dtype=np.int64)
+    shift = 7
+    while True:
+        big = values >> np.uint64(shift)
+        if not big.any():
+            break
+        nbytes += big > 0
+        shift += 7
+    offsets = np.cumsum(nbytes) - nbytes
+    data = np.empty(int(offsets[-1] + nbytes[-1]), dtype=np.uint8)
+    for k in range(int(nbytes.max())):
+        index = np.flatnonzero(nbytes > k)
+        group = (values[index] >> np.uint64(7 * k)) & np.uint64(0x7f)
+        more = (nbytes[index] > k + 1).astype(np.uint8) << 7
+        data[offsets[index] + k] = group.astype(np.uint8) | more
+    return data.tobytes()
+
+
+def decode_varint(data):
+    """Decode little-endian base-128 varints to unsigned integers."""
+    data = np.frombuffer(data, dtype=np.uint8)
+    if len(data) == 0 or int(data.max()) < 0x80:
+        return data.astype(np.uint64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    groups = ((data & 0x7f).astype(np.uint64) <<
+              (7 * position).astype(np.uint64))
+    return np.add.reduceat(groups, starts)
+
+
+def encode_block(primes):
+    """Encode gaps between consecutive primes as varints.
+
+    Gaps between odd primes are even and stored halved, so gaps up to 254
+    take a single byte. The only odd gap (2 to 3) is stored as 0.
+    """
+    return encode_varint(np.diff(primes) >> 1)
+
+
+def decode_block(first, count, payload):
+    """Decode block of count primes starting with first."""
+    primes = np.empty(count, dtype=np.int64)
+    if count == 0:
+        return primes
+    halves = decode_varint(payload).astype(np.int64)
+    gaps = 2 * halves
+    gaps[halves == 0] = 1
+    primes[0] = first
+    np.cumsum(gaps, out=primes[1:])
+    primes[1:] += first
+    return primes
+
+
+class PrimeStore(object):
+    """Define compressed prime list fed with consecutive chunks of primes.
+
+    Primes are kept in blocks of `block_size` primes, each holding its first
+    prime and the varint-encoded gaps. The block index (first prime, count,
+    payload offset) locates the block of any prime without decoding the
+    others. Primes of an incomplete last block are kept uncompressed.
+    """
+
+    title = 'Prime store'
+
+    def __init__(self, block_size=2**16):
+        self.block_size = block_size
+        self.first = []
+        self.counts = []
+        self.offsets = []
+        self.payloads = []
+        self.nbytes_payload = 0
+        self.pending = np.empty(0, dtype=np.int64)
+        self.cumulative = None
+
+    def update(self, chunk):
+        """Process next chunk of consecutive primes."""
+        chunk = np.asarray(chunk, dtype=np.int64)
+        if len(chunk) == 0:
+            return
+        if len(self.pending):
+            chunk = np.concatenate([self.pending, chunk])
+        full = len(chunk) // self.block_size * self.block_size
+        for start in range(0, full, self.block_size):
+            self.add_block(chunk[start:start + self.block_size])
+        self.pending = chunk[full:].copy()
+        self.cumulative = None
+
+    def add_block(self, primes):
+        """Encode block of consecutive primes."""
+        self.append(int(primes[0]), len(primes), encode_block(primes))
+
+    def append(self, first, count, payload):
+        """Append encoded block to index and payloads."""
+        self.first.append(first)
+        self.counts.append(count)
+        self.offsets.append(self.nbytes_payload)
+        self.payloads.append(payload)
+        self.nbytes_payload += len(payload)
+
+    def header(self):
+        """Return summary rows for output header."""
+        return [['Blocks', len(self.counts)],
+                ['Encoded size', '{} bytes'.format(self.nbytes)]]
+
+    def block(self, k):
+        """Decode k-th block."""
+        if k == len(self.counts):
+            return self.pending
+        return decode_block(self.first[k], self.counts[k], self.payloads[k])
+
+    def iter_chunks(self):
+        """Iterate over primes as NumPy arrays (one per block)."""
+        for k in range(len(self.counts)):
+            yield self.block(k)
+        if len(self.pending):
+            yield self.pending
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk.tolist()
+
+    def __len__(self):
+        return sum(self.counts) + len(self.pending)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('prime index out of range')
+        if self.cumulative is None:
+            self.cumulative = np.cumsum([0] + self.counts)
+        k = int(np.searchsorted(self.cumulative, index, side='right')) - 1
+        return int(self.block(k)[index - self.cumulative[k]])
+
+    def __repr__(self):
+        return 'PrimeStore(num_primes={}, nbytes={})'.format(len(self),
+                                                             self.nbytes)
+
+    @property
+    def nbytes(self):
+        """Return memory used by encoded blocks and pending primes."""
+        return (self.nbytes_payload + BLOCK.size * len(self.counts) +
+                self.pending.nbytes)
+
+
+class PrimeStoreWriter(PrimeStore):
+    """Define prime store that writes blocks to a packed file on the fly."""
+
+    def __init__(self, f, header, block_size=2**16):
+        super().__init__(block_size)
+        self.f = f
+        text = header.encode('UTF-8')
+        f.write(MAGIC + struct.pack('<I', len(text)) + text)
+
+    def append(self, first, count, payload):
+        """Write encoded block and keep its index only."""
+        self.f.write(BLOCK.pack(first, count, len(payload)))
+        self.f.write(payload)
+        self.first.append(first)
+        self.counts.append(count)
+        self.offsets.append(self.nbytes_payload)
+        self.nbytes_payload += len(payload)
+
+    def close(self):
+        """Write incomplete last block and end marker."""
+        if len(self.pending):
+            self.add_block(self.pending)
+            self.pending = np.empty(0, dtype=np.int64)
+        self.f.write(BLOCK.pack(0, 0, 0))
+
+
+def detect_compression(path):
+    """Detect compression of file from its leading bytes (None if plain)."""
+    with open(path, 'rb') as f:
+        start = f.read(8)
+    for name, magic in COMPRESSION_MAGIC.items():
+        if start.startswith(magic):
+            return name
+    return None
+
+
+def open_file(path, mode='rb', compress=None):
+    """Open plain, gzip or lzma file (compression detected when reading)."""
+    if 'r' in mode:
+        compress = detect_compression(path)
+    if compress == 'gzip':
+        return gzip.open(path, mode, encoding='UTF-8' if 't' in mode
+                         else None)
+    if compress == 'lzma':
+        return lzma.open(path, mode, encoding='UTF-8' if 't' in mode
+                         else None)
+    if 't' in mode:
+        return open(path, mode.replace('t', ''), encoding='UTF-8')
+    return open(path, mode)
+
+
+def is_packed(path):
+    """Check if file is a packed prime file."""
+    with open_file(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write(path, header, chunks, compress=None, block_size=2**16):
+    """Write header and chunks of consecutive primes to packed file."""
+    with open_file(path, 'wb', compress) as f:
+        writer = PrimeStoreWriter(f, header, block_size)
+        for chunk in chunks:
+            writer.update(chunk)
+        writer.close()
+    return writer
+
+
+def read_header(f):
+    """Read text header of packed file."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError('not a packed prime file')
+    length, = struct.unpack('<I', f.read(4))
+    return f.read(length).decode('UTF-8')
+
+
+def iter_blocks(f, skip=False):
+    """Iterate over block headers and payloads (None if skipped)."""
+    while True:
+        first, count, size = BLOCK.unpack(f.read(BLOCK.size))
+        if count == 0:
+            return
+        if skip:
+            f.seek(size, io.SEEK_CUR)
+            yield first, count, None
+        else:
+            yield first, count, f.read(size)
+
+
+def iter_chunks(path):
+    """Iterate over primes of packed file as NumPy arrays (one per block)."""
+    with open_file(path, 'rb') as f:
+        read_header(f)
+        for first, count, payload in iter_blocks(f):
+            yield decode_block(first, count, payload)
+
+
+def read_index(path):
+    """Read block index (first prime, count, file offset of block)."""
+    index = []
+    with open_file(path, 'rb') as f:
+        read_header(f)
+        offset = f.tell()
+        for first, count, payload in iter_blocks(f, skip=True):
+            index.append((first, count, offset))
+            offset = f.tell()
+    return index
+
+
+def read_block(path, offset):
+    """Decode block at file offset (from the block index)."""
+    with open_file(path, 'rb') as f:
+        f.seek(offset)
+        return decode_block(*next(iter_blocks(f)))
+
+
+def load(path):
+    """Load header and compressed primes of packed file into memory."""
+    store = PrimeStore()
+    with open_file(path, 'rb') as f:
+        header = read_header(f)
+        for first, count, payload in iter_blocks(f):
+            store.append(first, count, payload)
+    store.block_size = max(store.counts, default=store.block_size)
+    return header, store
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Chunked progress reporting with throughput, ETA and telemetry."""
+
+import datetime
+import json
+import os
+import sys
+import time
+
+
+# Stream for machine-readable progress lines (see open_telemetry)
+telemetry = None
+
+
+def open_telemetry(fd):
+    """Write machine-readable progress lines (JSON) to file descriptor."""
+    global telemetry
+    telemetry = os.fdopen(fd, 'w', buffering=1, closefd=False)
+    return telemetry
+
+
+def format_duration(seconds):
+    """Format duration in seconds as h:mm:ss."""
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+class Progress(object):
+    """Define progress of a run, updated once per chunk of iterations.
+
+    Updates only add to counters and look at the clock; the terminal line
+    and telemetry lines are refreshed at most every `interval` seconds.
+    Each iteration covers `scale` integers (the unit of the throughput).
+    """
+
+    def __init__(self, total, active=True, scale=1, unit='numbers',
+                 interval=0.5, stream=None):
+        self.total = total
+        self.active = active
+        self.scale = scale
+        self.unit = unit
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.telemetry = telemetry
+        self.enabled = active or self.telemetry is not None
+        self.done = 0
+        self.primes = 0
+        self.start = time.perf_counter()
+        self.next_report = self.start + interval
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, iterations, primes=0):
+        """Record finished chunk of iterations and primes found in it."""
+        # Plain integers (NumPy counts are not JSON serializable)
+        self.done += int(iterations)
+        self.primes += int(primes)
+        if self.enabled:
+            now = time.perf_counter()
+            if now >= self.next_report:
+                self.next_report = now + self.interval
+                self.report(now)
+
+    def chunks(self, iterations, found=None, chunk_size=None):
+        """Yield consecutive sub-ranges of range iterations.
+
+        Progress is updated after each sub-range; found (optional) returns
+        the number of primes found so far.
+        """
+        if chunk_size is None:
+            # About 1000 updates, but at least one per 4096 iterations
+            chunk_size = max(1, min(2**12, len(iterations) // 1000))
+        count = found() if found is not None else 0
+        for k in range(0, len(iterations), chunk_size):
+            part = iterations[k:k + chunk_size]
+            yield part
+            previous, count = count, found() if found is not None else 0
+            self.update(len(part), count - previous)
+
+    def values(self, now):
+        """Return progress values for report."""
+        elapsed = max(now - self.start, 1e-9)
+        rate = self.done / elapsed
+        eta = None
+        if rate > 0 and self.total:
+            eta = max(self.total - self.done, 0) / rate
+        return {'done': self.done, 'total': self.total,
+                'fraction': self.done / self.total if self.total else 1.0,
+                'elapsed': round(elapsed, 3), 'unit': self.unit,
+                'rate': self.scale * rate, 'primes': self.primes,
+                'primes_rate': self.primes / elapsed,
+                'eta': None if eta is None else round(eta, 3)}
+
+    def report(self, now, final=False):
+        """Refresh terminal line and write telemetry line."""
+        values = self.values(now)
+        if self.active:
+            line = '[progress] {:6.2f}% | {:.3g} {}/s'.format(
+                100 * values['fraction'], values['rate'], self.unit)
+            if self.primes:
+                line += ' | {:.3g} primes/s'.format(values['primes_rate'])
+            if final:
+                line += ' | elapsed {}'.format(
+                    format_duration(values['elapsed']))
+            elif values['eta'] is not None:
+                line += ' | ETA {}'.format(format_duration(values['eta']))
+            self.stream.write('\r{:<72}'.format(line) +
+                              ('\n' if final else ''))
+            self.stream.flush()
+        if self.telemetry is not None:
+            values['final'] = final
+            self.telemetry.write(json.dumps(values) + '\n')
+
+    def close(self):
+        """Write final report."""
+        if self.enabled:
+            self.report(time.perf_counter(), final=True)
+            self.enabled = False
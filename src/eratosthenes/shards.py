@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Sharded runs: manifest, independent shard workers and merge step."""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+import numpy as np
+import sieves
+from fingerprint import StreamFingerprint
+
+
+def make_manifest(lower, upper, count, path):
+    """Split [lower, upper] into count shards and write manifest file."""
+    if count < 1 or upper < lower:
+        raise ValueError('invalid shard specification')
+    stem = os.path.splitext(os.path.basename(path))[0]
+    bounds = [lower + (upper - lower + 1) * k // count
+              for k in range(count + 1)]
+    manifest = {
+        'lower': lower,
+        'upper': upper,
+        'shards': [{'index': k,
+                    'lower': bounds[k],
+                    'upper': bounds[k + 1] - 1,
+                    'file': '{}.shard{}.dat'.format(stem, k)}
+                   for k in range(count)],
+        }
+    with open(path, 'w', encoding='UTF-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(path):
+    """Load manifest file."""
+    with open(path, 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def shard_path(manifest_path, shard):
+    """Determine path of shard file (relative to manifest)."""
+    return os.path.join(os.path.dirname(manifest_path), shard['file'])
+
+
+def run_shard(manifest_path, index, segment_size=2**20):
+    """Determine primes of one shard and write self-describing shard file.
+
+    The file starts with the shard description and ends with the prime
+    count and the SHA-256 checksum of the prime lines. It is written to a
+    temporary name first, so incomplete shards are never picked up.
+    """
+    manifest = load_manifest(manifest_path)
+    if not 0 <= index < len(manifest['shards']):
+        raise ValueError('shard index {} out of range (manifest has {} '
+                         'shards)'.format(index, len(manifest['shards'])))
+    shard = manifest['shards'][index]
+    path = shard_path(manifest_path, shard)
+    checksum = hashlib.sha256()
+    fingerprint = StreamFingerprint()
+    count = 0
+    start = time.process_time()
+    with open(path + '.temp', 'w', encoding='UTF-8') as f:
+        f.write('# Eratosthenes shard\n')
+        f.write('# index: {}\n'.format(index))
+        f.write('# shards: {}\n'.format(len(manifest['shards'])))
+        f.write('# lower: {}\n'.format(shard['lower']))
+        f.write('# upper: {}\n'.format(shard['upper']))
+        for chunk in sieves.iter_range(shard['lower'], shard['upper'],
+                                       segment_size):
+            lines = ''.join('{}\n'.format(p) for p in chunk.tolist())
+            checksum.update(lines.encode('ascii'))
+            fingerprint.update(chunk)
+            count += len(chunk)
+            f.write(lines)
+        f.write('# count: {}\n'.format(count))
+        f.write('# sha256: {}\n'.format(checksum.hexdigest()))
+        write_fingerprint(f, fingerprint)
+        f.write('# time: {:.9f}\n'.format(time.process_time() - start))
+    os.replace(path + '.temp', path)
+    return count, checksum.hexdigest()
+
+
+def write_fingerprint(f, fingerprint):
+    """Write fingerprint trailer lines (except count)."""
+    f.write('# fingerprint: {}\n'.format(fingerprint.digest()))
+    f.write('# sum: {}\n'.format(fingerprint.sum))
+    f.write('# last: {}\n'.format(fingerprint.values()['last']))
+
+
+def read_shard_info(path):
+    """Read description from header and trailer lines of shard file."""
+    info = {}
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+        f.seek(max(0, os.path.getsize(path) - 4096))
+        tail = f.read()
+    for part in (head, tail):
+        for line in part.decode('ascii', 'replace').splitlines():
+            if line.startswith('# ') and ': ' in line:
+                key, value = line[2:].split(': ', 1)
+                info[key] = value
+    for key in ('index', 'shards', 'lower', 'upper', 'count'):
+        if key in info:
+            info[key] = int(info[key])
+    return info
+
+
+def check_coverage(manifest, infos):
+    """Check that shards cover manifest range without gaps or overlaps."""
+    errors = []
+    position = manifest['lower']
+    for info in sorted(infos, key=lambda item: item['lower']):
+        if info['lower'] != position:
+            errors.append('range [{}, {}] not covered'.format(
+                position, info['lower'] - 1) if info['lower'] > position
+                else 'shard {} overlaps at {}'.format(info['index'],
+                                                     info['lower']))
+        position = max(position, info['upper'] + 1)
+    if position != manifest['upper'] + 1:
+        errors.append('range [{}, {}] not covered'.format(position,
+                                                         manifest['upper']))
+    return errors
+
+
+def copy_shard(info, out=None, fingerprint=None):
+    """Verify count and checksum of shard while copying its prime lines."""
+    checksum = hashlib.sha256()
+    count = 0
+    with open(info['path'], 'r', encoding='UTF-8') as f:
+        while True:
+            lines = list(itertools.islice(f, 2**16))
+            if not lines:
+                break
+            lines = [line for line in lines if not line.startswith('#')]
+            text = ''.join(lines)
+            checksum.update(text.encode('ascii'))
+            if fingerprint is not None and lines:
+                fingerprint.update(np.array(lines).astype(np.int64))
+            count += len(lines)
+            if out is not None:
+                out.write(text)
+    return count == info['count'] and checksum.hexdigest() == info['sha256']
+
+
+def merge(manifest_path, outfile=None, verbosity=0):
+    """Validate shards and concatenate them to outfile (or sum counts)."""
+    manifest = load_manifest(manifest_path)
+    infos = []
+    errors = []
+    for shard in manifest['shards']:
+        path = shard_path(manifest_path, shard)
+        if not os.path.exists(path):
+            errors.append('shard {} missing (\'{}\')'.format(shard['index'],
+                                                            path))
+            continue
+        info = read_shard_info(path)
+        if 'sha256' not in info or info['lower'] != shard['lower'] or \
+                info['upper'] != shard['upper']:
+            errors.append('shard {} incomplete or not matching '
+                          'manifest'.format(shard['index']))
+            continue
+        info['path'] = path
+        infos.append(info)
+    if not errors:
+        errors = check_coverage(manifest, infos)
+    if errors:
+        for error in errors:
+            print('[merge] Error: {}.'.format(error))
+        return None
+    total = sum(info['count'] for info in infos)
+    out = None
+    fingerprint = None
+    if outfile is not None:
+        # Fingerprint of the merged stream
+        fingerprint = StreamFingerprint()
+        out = open(outfile, 'w', encoding='UTF-8')
+        out.write('# Eratosthenes merged shards\n')
+        out.write('# lower: {}\n'.format(manifest['lower']))
+        out.write('# upper: {}\n'.format(manifest['upper']))
+        out.write('# count: {}\n'.format(total))
+    try:
+        # Verify checksums (while copying prime lines to outfile)
+        for info in sorted(infos, key=lambda item: item['lower']):
+            if not copy_shard(info, out, fingerprint):
+                print('[merge] Error: checksum mismatch in shard '
+                      '{}.'.format(info['index']))
+                if out is not None:
+                    out.close()
+                    os.remove(outfile)
+                return None
+        if out is not None:
+            write_fingerprint(out, fingerprint)
+    finally:
+        if out is not None:
+            out.close()
+    if verbosity >= 0:
+        print('[merge] {} shards cover [{}, {}] with {} prime '
+              'numbers.'.format(len(infos), manifest['lower'],
+                                manifest['upper'], total))
+    return total
@@ -2,8 +2,18 @@
 # -*- coding: utf-8 -*-
 """Collection of sieve algorithms (memory mode)."""
 
-import numpy as np
-from tqdm import tqdm
+import collections
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import numpy as np
+    from bitmap import PrimeBitmap
+except ImportError:             # trial division works without NumPy
+    np = None
+import deadline as dl
+from progress import Progress
 
 
 # Divisor algorithms
@@ -31,7 +41,7 @@ def divisors_sqrt(number):
     elif number >= 1:           # 1 is always divisor for number >= 1
         divs.append(1)
     if number >= 2:
-        for i in range(2, int(np.sqrt(number))+1):
+        for i in range(2, int(math.sqrt(number))+1):
             if number % i == 0:
                 divs.append(i)
         divs.append(number)     # number itself is always divisor
@@ -71,7 +81,7 @@ def isprime_sqrt(number):
     if number < 2:                  # 0 and 1 are not prime
         return False
     if number >= 2:
-        for i in range(2, int(np.sqrt(number))+1):
+        for i in range(2, int(math.sqrt(number))+1):
             if number % i == 0:     # check for divisor other than 1 or number
                 return False
         return True
@@ -86,12 +96,111 @@ def isprime_sqrt_odd(number):
     if number % 2 == 0:             # check if 2 is divisor
         return False
     if number > 2:
-        for i in range(3, int(np.sqrt(number))+1, 2):
+        for i in range(3, int(math.sqrt(number))+1, 2):
             if number % i == 0:     # check for divisor other than 1 or number
                 return False
         return True
 
 
+# Segment helpers
+
+def odd_primes_upto(limit):
+    """Determine all odd primes up to limit with an odd-only sieve."""
+    sieve = np.ones((limit + 1) // 2, dtype=bool)
+    sieve[:1] = False                   # 1 is not prime
+    for i in range(1, (int(np.sqrt(limit)) - 1) // 2 + 1):
+        if sieve[i]:
+            p = 2 * i + 1
+            sieve[p * p // 2::p] = False
+    return 2 * np.flatnonzero(sieve) + 1
+
+
+def sieve_segment_odd(lo, hi, base_primes):
+    """Sieve odd numbers 2*i+1 for lo <= i < hi with odd base primes."""
+    segment = np.ones(hi - lo, dtype=bool)
+    if lo == 0 and hi > 0:
+        segment[0] = False              # 1 is not prime
+    # Only primes with p*p inside the segment range strike anything
+    base_primes = base_primes[(base_primes * base_primes - 1) // 2 < hi]
+    # First index j >= lo with 2*j+1 an odd multiple of p (but >= p*p)
+    starts = np.maximum((base_primes * base_primes - 1) // 2,
+                        lo + ((base_primes - 1) // 2 - lo) % base_primes)
+    for p, start in zip(base_primes.tolist(), (starts - lo).tolist()):
+        segment[start::p] = False
+    return segment
+
+
+def map_segments(function, bounds, threads=1, deadline=None):
+    """Yield lo, hi and function(lo, hi) for bounds in order.
+
+    With threads > 1, segments are processed by a pool of threads (NumPy
+    releases the GIL while marking and scanning large segments). At most
+    2 * threads segments are in flight, so results are consumed in order
+    without holding more than a few segments. With a deadline (which sizes
+    bounds), each call of function is timed, and the next bounds are only
+    drawn once fewer segments than CPUs are unfinished and these leave time
+    for another one.
+    """
+    if threads == 1:
+        for lo, hi in bounds:
+            yield lo, hi, function(lo, hi)
+        return
+
+    def timed(lo, hi):
+        """Call function and record its processing time."""
+        begin = time.perf_counter()
+        result = function(lo, hi)
+        deadline.record(hi - lo, time.perf_counter() - begin)
+        return result
+
+    # Threads beyond the number of CPUs add no throughput
+    workers = min(threads, os.cpu_count() or 1)
+    bounds = iter(bounds)
+    pending = collections.deque()
+    with ThreadPoolExecutor(threads) as executor:
+        try:
+            while True:
+                # With a deadline, draw next bounds once a worker is free and
+                # the unfinished segments leave time for another one
+                while deadline is not None and pending:
+                    items = [hi - lo for lo, hi, future in pending
+                             if not future.done()]
+                    if len(items) < workers and deadline.fits(
+                            deadline.size + sum(items), workers):
+                        break
+                    lo, hi, future = pending.popleft()
+                    yield lo, hi, future.result()
+                bound = next(bounds, None)
+                if bound is None:
+                    break
+                lo, hi = bound
+                pending.append((lo, hi, executor.submit(
+                    function if deadline is None else timed, lo, hi)))
+                if len(pending) >= 2 * threads:
+                    lo, hi, future = pending.popleft()
+                    yield lo, hi, future.result()
+            while pending:
+                lo, hi, future = pending.popleft()
+                yield lo, hi, future.result()
+        finally:
+            for lo, hi, future in pending:
+                future.cancel()
+
+
+def iter_range(lower, upper, segment_size=2**20):
+    """Iterate over primes in [lower, upper] as arrays of one segment each."""
+    if lower <= 2 <= upper:
+        yield np.array([2], dtype=np.int64)
+    base_primes = odd_primes_upto(int(np.sqrt(max(upper, 0))))
+    # Odd numbers 2*i+1 within [lower, upper]
+    first = max(lower, 0) // 2
+    end = (upper + 1) // 2 if upper >= 1 else 0
+    for lo in range(first, end, segment_size):
+        hi = min(lo + segment_size, end)
+        segment = sieve_segment_odd(lo, hi, base_primes)
+        yield 2 * (np.flatnonzero(segment) + lo) + 1
+
+
 # Sieve algorithms
 
 def alg_all(divisorfunc, limit_specified, progress_bar_active=True):
@@ -104,9 +213,11 @@ def alg_all(divisorfunc, limit_specified, progress_bar_active=True):
     end = limit_specified + 1
     # Additional try block for handling keyboard interrupt
     try:
-        for i in tqdm(range(2, end), disable=not(progress_bar_active)):
-            if divisorfunc(i) is True:
-                prime.append(i)
+        with Progress(end - 2, progress_bar_active) as bar:
+            for part in bar.chunks(range(2, end), prime.__len__):
+                for i in part:
+                    if divisorfunc(i) is True:
+                        prime.append(i)
         last_iter = i
     except KeyboardInterrupt:
         last_iter = i
@@ -134,9 +245,12 @@ def alg_odd(divisorfunc, limit_specified, progress_bar_active=True):
         prime.append(2)
     # Additional try block for handling keyboard interrupt
     try:
-        for i in tqdm(range(3, end, 2), disable=not(progress_bar_active)):
-            if divisorfunc(i) is True:
-                prime.append(i)
+        iterations = range(3, end, 2)
+        with Progress(len(iterations), progress_bar_active, 2) as bar:
+            for part in bar.chunks(iterations, prime.__len__):
+                for i in part:
+                    if divisorfunc(i) is True:
+                        prime.append(i)
         last_iter = i + 1
     except KeyboardInterrupt:
         last_iter = i + 1
@@ -167,14 +281,18 @@ def alg_fk(sieve_method, divisorfunc, limit_specified,
         prime.append(3)
     # Additional try block for handling keyboard interrupt
     try:
-        for i in tqdm(range(1, end), disable=not(progress_bar_active)):
-            class1 = sieve_method.factor * i + sieve_method.summand1
-            class2 = sieve_method.factor * i + sieve_method.summand2
-            if divisorfunc(class1) is True:
-                prime.append(class1)
-            # Check if class2 exceeds limit:
-            if class2 <= limit_specified and divisorfunc(class2) is True:
-                prime.append(class2)
+        with Progress(end - 1, progress_bar_active,
+                      sieve_method.factor) as bar:
+            for part in bar.chunks(range(1, end), prime.__len__):
+                for i in part:
+                    class1 = sieve_method.factor * i + sieve_method.summand1
+                    class2 = sieve_method.factor * i + sieve_method.summand2
+                    if divisorfunc(class1) is True:
+                        prime.append(class1)
+                    # Check if class2 exceeds limit:
+                    if (class2 <= limit_specified and
+                            divisorfunc(class2) is True):
+                        prime.append(class2)
         last_iter = i + 1
     except KeyboardInterrupt:
         last_iter = i + 1
@@ -192,11 +310,13 @@ def alg_fk(sieve_method, divisorfunc, limit_specified,
 def alg_multiples_all(limit_specified, progress_bar_active=True):
     """Classical sieve of Eratosthenes with deletion of multiples."""
     nums = list(range(limit_specified+1))
-    for j in tqdm(range(2, limit_specified+1),
-                  disable=not(progress_bar_active)):
-        for i in range(0, limit_specified+1):
-            if nums[i] in nums[::j][2:]:
-                nums[i] = 0             # Mark multiples of j as 0
+    iterations = range(2, limit_specified+1)
+    with Progress(len(iterations), progress_bar_active) as bar:
+        for part in bar.chunks(iterations):
+            for j in part:
+                for i in range(0, limit_specified+1):
+                    if nums[i] in nums[::j][2:]:
+                        nums[i] = 0     # Mark multiples of j as 0
     del nums[0]                         # Delete 0
     del nums[0]                         # Delete 1
     nums = [i for i in nums if i != 0]  # Delete all multiples marked as 0
@@ -206,23 +326,173 @@ def alg_multiples_all(limit_specified, progress_bar_active=True):
 def alg_multiples_all_np(limit_specified, progress_bar_active=True):
     """Classical sieve of Eratosthenes with deletion of multiples (Numpy version)."""
     nums = np.arange(2, limit_specified+1)
-    for j in tqdm(range(2, limit_specified+1),
-                  disable=not(progress_bar_active)):
-        multiples = np.arange(j, limit_specified+1, j)
-        for i in multiples[1:]:
-            nums = np.delete(nums, np.argwhere(nums == i))
+    iterations = range(2, limit_specified+1)
+    with Progress(len(iterations), progress_bar_active) as bar:
+        for part in bar.chunks(iterations):
+            for j in part:
+                multiples = np.arange(j, limit_specified+1, j)
+                for i in multiples[1:]:
+                    nums = np.delete(nums, np.argwhere(nums == i))
     return nums
 
 
+# Arithmetic functions for the linear sieve: value at 1, value at prime
+# power p**k from value at p**(k-1), and whether the function is additive
+# (omega) instead of multiplicative
+arithmetic_functions = {
+    'divisors': (1, lambda prev, p, pk: prev + 1, False),
+    'phi': (1, lambda prev, p, pk: pk - pk // p, False),
+    'mu': (1, lambda prev, p, pk: -1 if pk == p else 0, False),
+    'sigma': (1, lambda prev, p, pk: prev + pk, False),
+    'omega': (0, lambda prev, p, pk: 1, True),
+    }
+
+
+def multiplicative(end, functions=('divisors',), progress_bar_active=True):
+    """Determine arithmetic functions of 1, ..., end with a linear sieve.
+
+    Return table with columns number, function_1, function_2, ... in the
+    order of functions. The functions are computed into preallocated int64
+    columns of the table.
+    """
+    # Initialize variables
+    interrupt = False
+    limit_actual = end
+    last_iter = 0
+    specs = [arithmetic_functions[name] for name in functions]
+    # Row n holds number n (row 0 is dropped at the end)
+    table = np.empty((end + 1, len(specs) + 1), dtype=np.int64)
+    table[:, 0] = np.arange(end + 1)
+    for k, spec in enumerate(specs):
+        table[:, k + 1] = spec[0]
+    spf = np.zeros(end + 1, dtype=np.int64)     # smallest prime factor
+    lowpow = np.zeros(end + 1, dtype=np.int64)  # power of spf in n
+    primes = []
+    columns = [(spec, table[:, k + 1]) for k, spec in enumerate(specs)]
+    n = 1
+    # Additional try block for handling keyboard interrupt
+    try:
+        with Progress(max(end - 1, 0), progress_bar_active) as bar:
+            for part in bar.chunks(range(2, end + 1), primes.__len__):
+                for n in part:
+                    if spf[n] == 0:
+                        spf[n] = lowpow[n] = n
+                        primes.append(n)
+                        for (one, power, additive), value in columns:
+                            value[n] = power(one, n, n)
+                    spf_n = int(spf[n])
+                    for p in primes:
+                        m = n * p
+                        if p > spf_n or m > end:
+                            break
+                        spf[m] = p
+                        if p < spf_n:
+                            lowpow[m] = p
+                            rest, pk = n, p
+                        else:
+                            lowpow[m] = lowpow[n] * p
+                            pk = int(lowpow[m])
+                            rest = m // pk
+                        for (one, power, additive), value in columns:
+                            if rest == 1:
+                                value[m] = power(int(value[n]), p, m)
+                            elif additive:
+                                value[m] = value[rest] + value[pk]
+                            else:
+                                value[m] = value[rest] * value[pk]
+        last_iter = end
+    except KeyboardInterrupt:
+        last_iter = n - 1
+        limit_actual = n - 1
+        print('[KeyboardInterrupt exception] Interrupt at iteration '
+              ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+        print('[KeyboardInterrupt exception] Actually '
+              'tested integer range is [1, '
+              '{}].'.format(limit_actual))
+        interrupt = True
+    return table[1:limit_actual + 1], interrupt, last_iter, limit_actual
+
+
 def numdivisors(end, progress_bar_active=True):
     """Determine the number of divisors of a number."""
     dividends = np.arange(start=1, stop=end+1, dtype=int)
     divisors = np.arange(start=1, stop=end+1, dtype=int)
-    for i in tqdm(range(1, len(dividends)+1), disable=not(progress_bar_active)):
-        ndivisors = 0
-        for j in range(1, i//2+1):      # only check up to half
-            if i % j == 0:
-                ndivisors += 1
-        divisors[i-1] = ndivisors+1     # add 1 for dividend itself
+    iterations = range(1, len(dividends)+1)
+    with Progress(len(iterations), progress_bar_active) as bar:
+        for part in bar.chunks(iterations):
+            for i in part:
+                ndivisors = 0
+                for j in range(1, i//2+1):      # only check up to half
+                    if i % j == 0:
+                        ndivisors += 1
+                divisors[i-1] = ndivisors+1     # add 1 for dividend itself
     new = np.column_stack([dividends, divisors])
     return new
+
+
+def alg_bitmap(limit_specified, progress_bar_active=True,
+               segment_size=2**20, passes=(), store=True, time_limit=None,
+               threads=1):
+    """Segmented odd-only sieve of Eratosthenes into a prime bitmap.
+
+    Every pass in passes is updated with the primes of each segment. With
+    store=False, no bitmap is kept and an empty list is returned instead.
+    With time_limit (seconds), segment sizes adapt and sifting stops at the
+    last segment that fits into the time budget. With threads > 1 (0 =
+    number of CPUs), segments are sifted by a thread pool sharing the base
+    primes and marking disjoint byte ranges of the bitmap in place.
+    """
+    # Initialize variables
+    interrupt = False
+    limit_actual = limit_specified
+    last_iter = 0
+    end = (limit_specified + 1) // 2 if limit_specified >= 1 else 0
+    # Keep segments byte-aligned so that packed segments never overlap
+    segment_size = max(8, segment_size // 8 * 8)
+    bits = np.zeros((end + 7) // 8 if store else 0, dtype=np.uint8)
+    base_primes = odd_primes_upto(int(np.sqrt(limit_specified)))
+    deadline = None
+    if time_limit is not None:
+        deadline = dl.Deadline(time_limit, 2**13, granularity=8,
+                               maximum=segment_size)
+    threads = threads or os.cpu_count()
+
+    def sift(lo, hi):
+        """Sift segment, mark it in bitmap and extract primes for passes."""
+        segment = sieve_segment_odd(lo, hi, base_primes)
+        if store:
+            bits[lo // 8:(hi + 7) // 8] = np.packbits(segment,
+                                                      bitorder='little')
+        primes = 2 * (np.flatnonzero(segment) + lo) + 1 if passes else None
+        return primes, int(np.count_nonzero(segment))
+
+    if limit_specified >= 2:
+        for item in passes:
+            item.update(np.array([2], dtype=np.int64))
+    segments = map_segments(sift, dl.chunk_bounds(0, end, segment_size,
+                                                  deadline, threads == 1),
+                            threads, deadline)
+    # Additional try block for handling keyboard interrupt
+    try:
+        with Progress(end, progress_bar_active, 2) as bar:
+            for lo, hi, (primes, count) in segments:
+                for item in passes:
+                    item.update(primes)
+                last_iter = hi
+                bar.update(hi - lo, count)
+        if deadline is not None and deadline.reached:
+            limit_actual = max(2 * last_iter - 1, min(limit_specified, 2))
+            dl.report(deadline, last_iter, end, limit_actual)
+            interrupt = True
+    except KeyboardInterrupt:
+        limit_actual = max(2 * last_iter - 1, min(limit_specified, 2))
+        print('[KeyboardInterrupt exception] Interrupt at iteration '
+              ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+        print('[KeyboardInterrupt exception] Actually '
+              'tested integer range is [0, '
+              '{}].'.format(limit_actual))
+        interrupt = True
+    finally:
+        segments.close()
+    prime = PrimeBitmap(bits, limit_actual) if store else []
+    return prime, interrupt, last_iter, limit_actual
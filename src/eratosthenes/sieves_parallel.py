@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Collection of sieve algorithms (parallel mode)."""
+
+import multiprocessing
+import signal
+import deadline as dl
+from progress import Progress
+
+
+def ignore_interrupt():
+    """Leave keyboard interrupt handling to the parent process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def prefix_primes(sieve_method, limit_specified):
+    """Determine primes not covered by the iterations of sieve method."""
+    if sieve_method.name == 'all':
+        small = []
+    elif sieve_method.name == 'odd':
+        small = [2]
+    else:
+        small = [2, 3]
+    return [p for p in small if p <= limit_specified]
+
+
+def iteration_range(sieve_method, limit_specified):
+    """Determine range [start, end) of iterations of sieve method."""
+    if sieve_method.name == 'all':
+        return 2, limit_specified + 1
+    elif sieve_method.name == 'odd':
+        # Iteration i checks odd number 2*i+1
+        return 1, (limit_specified + 1) // 2
+    return 1, ((limit_specified + sieve_method.limit_shift) //
+               sieve_method.factor + 1)
+
+
+def iteration_scale(sieve_method):
+    """Determine number of integers covered by one iteration."""
+    if sieve_method.name == 'all':
+        return 1
+    elif sieve_method.name == 'odd':
+        return 2
+    return sieve_method.factor
+
+
+def tested_limit(sieve_method, limit_specified, last_iter):
+    """Determine largest integer tested by iterations before last_iter.
+
+    The prefix primes are part of every result, so the tested range covers
+    them even if no iteration finished.
+    """
+    if sieve_method.name == 'all':
+        limit_actual = last_iter - 1
+    elif sieve_method.name == 'odd':
+        limit_actual = 2 * last_iter - 1
+    else:
+        limit_actual = (sieve_method.factor * (last_iter - 1) +
+                        sieve_method.summand2)
+    return max([min(limit_actual, limit_specified), 0] +
+               prefix_primes(sieve_method, limit_specified))
+
+
+def reported_iteration(sieve_method, last_iter):
+    """Convert iteration to the counting of the serial algorithms."""
+    # Serial odd-number algorithm counts integers instead of odd numbers
+    if sieve_method.name == 'odd':
+        return 2 * last_iter
+    return last_iter
+
+
+def test_chunk(task):
+    """Check candidates of iterations [lo, hi) for primality."""
+    sieve_method, divisorfunc, limit_specified, lo, hi = task
+    prime = []
+    if sieve_method.name == 'all':
+        for i in range(lo, hi):
+            if divisorfunc(i) is True:
+                prime.append(i)
+    elif sieve_method.name == 'odd':
+        for i in range(lo, hi):
+            if divisorfunc(2 * i + 1) is True:
+                prime.append(2 * i + 1)
+    else:
+        for i in range(lo, hi):
+            class1 = sieve_method.factor * i + sieve_method.summand1
+            class2 = sieve_method.factor * i + sieve_method.summand2
+            if divisorfunc(class1) is True:
+                prime.append(class1)
+            # Check if class2 exceeds limit:
+            if class2 <= limit_specified and divisorfunc(class2) is True:
+                prime.append(class2)
+    return prime
+
+
+def chunk_tasks(sieve_method, divisorfunc, limit_specified, jobs,
+                chunk_size=None):
+    """Split iterations into tasks for the worker processes."""
+    start, end = iteration_range(sieve_method, limit_specified)
+    if chunk_size is None:
+        # Many small chunks balance the growing cost of larger candidates
+        chunk_size = max(1, min(2**16, -(-(end - start) // (jobs * 32))))
+    return [(sieve_method, divisorfunc, limit_specified, lo,
+             min(lo + chunk_size, end))
+            for lo in range(start, end, chunk_size)]
+
+
+def map_chunks(tasks, jobs):
+    """Yield results of tasks in order, computed by a pool of jobs workers."""
+    if jobs == 1:
+        for task in tasks:
+            yield test_chunk(task)
+        return
+    pool = multiprocessing.Pool(jobs, initializer=ignore_interrupt)
+    try:
+        yield from pool.imap(test_chunk, tasks)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def map_deadline(sieve_method, divisorfunc, limit_specified, jobs,
+                 deadline):
+    """Yield tasks and results in waves of jobs chunks until deadline."""
+    start, end = iteration_range(sieve_method, limit_specified)
+    pool = None
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs, initializer=ignore_interrupt)
+    try:
+        # Each wave is one adaptively sized chunk, split among the workers
+        for lo, hi in dl.chunk_bounds(start, end, None, deadline):
+            size = -(-(hi - lo) // jobs)
+            tasks = [(sieve_method, divisorfunc, limit_specified, a,
+                      min(a + size, hi)) for a in range(lo, hi, size)]
+            if pool is None:
+                results = [test_chunk(task) for task in tasks]
+            else:
+                results = pool.map(test_chunk, tasks)
+            yield from zip(tasks, results)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def ordered_results(sieve_method, divisorfunc, limit_specified, jobs,
+                    chunk_size=None, deadline=None):
+    """Yield tasks and their results in order of the iterations."""
+    if deadline is not None:
+        yield from map_deadline(sieve_method, divisorfunc, limit_specified,
+                                jobs, deadline)
+        return
+    tasks = chunk_tasks(sieve_method, divisorfunc, limit_specified, jobs,
+                        chunk_size)
+    results = map_chunks(tasks, jobs)
+    try:
+        yield from zip(tasks, results)
+    finally:
+        results.close()
+
+
+def alg_parallel(sieve_method, divisorfunc, limit_specified, jobs=None,
+                 progress_bar_active=True, chunk_size=None, time_limit=None):
+    """Check candidates of sieve method in parallel worker processes.
+
+    With time_limit (seconds), chunk sizes adapt and checking stops at the
+    last chunk that fits into the time budget.
+    """
+    # Initialize variables
+    jobs = jobs or multiprocessing.cpu_count()
+    prime = prefix_primes(sieve_method, limit_specified)
+    interrupt = False
+    limit_actual = limit_specified
+    last_iter, end = iteration_range(sieve_method, limit_specified)
+    deadline = None
+    if time_limit is not None:
+        deadline = dl.Deadline(time_limit, 2**6 * jobs)
+    results = ordered_results(sieve_method, divisorfunc, limit_specified,
+                              jobs, chunk_size, deadline)
+    # Additional try block for handling keyboard interrupt
+    try:
+        with Progress(end - last_iter, progress_bar_active,
+                      iteration_scale(sieve_method)) as bar:
+            for task, chunk in results:
+                prime.extend(chunk)
+                bar.update(task[4] - task[3], len(chunk))
+                last_iter = task[4]
+        if deadline is not None and deadline.reached:
+            limit_actual = tested_limit(sieve_method, limit_specified,
+                                        last_iter)
+            dl.report(deadline, last_iter, end, limit_actual)
+            interrupt = True
+    except KeyboardInterrupt:
+        limit_actual = tested_limit(sieve_method, limit_specified, last_iter)
+        print('[KeyboardInterrupt exception] Interrupt at iteration '
+              ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+        print('[KeyboardInterrupt exception] Actually '
+              'tested integer range is [0, '
+              '{}].'.format(limit_actual))
+        interrupt = True
+    finally:
+        results.close()
+        return (prime, interrupt,
+                reported_iteration(sieve_method, last_iter), limit_actual)
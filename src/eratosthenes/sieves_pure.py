@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Collection of sieve algorithms without NumPy (standard library only)."""
+
+from itertools import compress
+from progress import Progress
+
+
+def isqrt(number):
+    """Determine integer square root of number."""
+    root = int(number ** 0.5)
+    while root * root > number:
+        root -= 1
+    while (root + 1) * (root + 1) <= number:
+        root += 1
+    return root
+
+
+def alg_bytearray(limit_specified, progress_bar_active=True):
+    """Odd-only sieve of Eratosthenes with bytearray slice assignment."""
+    # Initialize variables
+    prime = []
+    interrupt = False
+    limit_actual = limit_specified
+    last_iter = 0
+    # Index i represents odd number 2*i+1
+    size = (limit_specified + 1) // 2 if limit_specified >= 1 else 0
+    end = (isqrt(max(limit_specified, 0)) - 1) // 2 + 1
+    sieve = bytearray(b'\x01') * size
+    if size > 0:
+        sieve[0] = 0                    # 1 is not prime
+    iterations = range(1, end)
+    # Additional try block for handling keyboard interrupt
+    try:
+        with Progress(len(iterations), progress_bar_active,
+                      unit='iterations') as bar:
+            for part in bar.chunks(iterations):
+                for i in part:
+                    if sieve[i]:
+                        p = 2 * i + 1
+                        start = p * p // 2
+                        sieve[start::p] = bytes((size - start - 1) // p + 1)
+        last_iter = max(end - 1, 0)
+    except KeyboardInterrupt:
+        last_iter = i - 1
+        # Multiples of all primes below 2*i+1 are marked
+        limit_actual = min(limit_specified, (2 * i + 1)**2 - 1)
+        size = min(size, (limit_actual + 1) // 2)
+        print('[KeyboardInterrupt exception] Interrupt at iteration '
+              ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+        print('[KeyboardInterrupt exception] Actually '
+              'tested integer range is [0, '
+              '{}].'.format(limit_actual))
+        interrupt = True
+    finally:
+        if limit_actual >= 2:
+            prime.append(2)
+        prime.extend(compress(range(1, 2 * size, 2), sieve[:size]))
+        return prime, interrupt, last_iter, limit_actual
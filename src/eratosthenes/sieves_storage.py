@@ -3,7 +3,15 @@
 """Collection of sieve algorithms (storage mode)."""
 
 
-from tqdm import tqdm
+import os
+try:
+    import numpy as np
+except ImportError:             # trial division works without NumPy
+    np = None
+import sieves
+import sieves_parallel
+import deadline as dl
+from progress import Progress
 
 
 def alg_all(divisorfunc, limit_specified, outfile, progress_bar_active=True):
@@ -15,10 +23,11 @@ def alg_all(divisorfunc, limit_specified, outfile, progress_bar_active=True):
     with open(outfile, 'w', encoding='UTF-8') as f:
         # Additional try block for handling keyboard interrupt
         try:
-            for i in tqdm(range(2, end),
-                          disable=not(progress_bar_active)):
-                if divisorfunc(i) is True:
-                    f.write('{}\n'.format(i))
+            with Progress(end - 2, progress_bar_active) as bar:
+                for part in bar.chunks(range(2, end)):
+                    for i in part:
+                        if divisorfunc(i) is True:
+                            f.write('{}\n'.format(i))
             last_iter = i + 1
         except KeyboardInterrupt:
             last_iter = i + 1
@@ -46,10 +55,12 @@ def alg_odd(divisorfunc, limit_specified, outfile, progress_bar_active=True):
             f.write('{}\n'.format(2))
         # Additional try block for handling keyboard interrupt
         try:
-            for i in tqdm(range(3, end, 2),
-                          disable=not(progress_bar_active)):
-                if divisorfunc(i) is True:
-                    f.write('{}\n'.format(i))
+            iterations = range(3, end, 2)
+            with Progress(len(iterations), progress_bar_active, 2) as bar:
+                for part in bar.chunks(iterations):
+                    for i in part:
+                        if divisorfunc(i) is True:
+                            f.write('{}\n'.format(i))
             last_iter = i + 1
         except KeyboardInterrupt:
             last_iter = i + 1
@@ -80,14 +91,20 @@ def alg_fk(sieve_method, divisorfunc, limit_specified, outfile,
             f.write('{}\n'.format(3))
         # Additional try block for handling keyboard interrupt
         try:
-            for i in tqdm(range(1, end), disable=not(progress_bar_active)):
-                class1 = sieve_method.factor * i + sieve_method.summand1
-                class2 = sieve_method.factor * i + sieve_method.summand2
-                if divisorfunc(class1) is True:
-                    f.write('{}\n'.format(class1))
-                # Check if class2 exceeds limit:
-                if class2 <= limit_specified and divisorfunc(class2) is True:
-                    f.write('{}\n'.format(class2))
+            with Progress(end - 1, progress_bar_active,
+                          sieve_method.factor) as bar:
+                for part in bar.chunks(range(1, end)):
+                    for i in part:
+                        class1 = (sieve_method.factor * i +
+                                  sieve_method.summand1)
+                        class2 = (sieve_method.factor * i +
+                                  sieve_method.summand2)
+                        if divisorfunc(class1) is True:
+                            f.write('{}\n'.format(class1))
+                        # Check if class2 exceeds limit:
+                        if (class2 <= limit_specified and
+                                divisorfunc(class2) is True):
+                            f.write('{}\n'.format(class2))
             last_iter = i + 1
         except KeyboardInterrupt:
             last_iter = i + 1
@@ -100,3 +117,115 @@ def alg_fk(sieve_method, divisorfunc, limit_specified, outfile,
             interrupt = True
         finally:
             return interrupt, last_iter, limit_actual
+
+
+def alg_bitmap(limit_specified, outfile, progress_bar_active=True,
+               segment_size=2**20, passes=(), time_limit=None, threads=1):
+    """Segmented odd-only sieve of Eratosthenes (segment-wise writing)."""
+    # Initialize variables
+    interrupt = False
+    limit_actual = limit_specified
+    last_iter = 0
+    end = (limit_specified + 1) // 2 if limit_specified >= 1 else 0
+    segment_size = max(8, segment_size // 8 * 8)
+    base_primes = sieves.odd_primes_upto(int(np.sqrt(limit_specified)))
+    deadline = None
+    if time_limit is not None:
+        deadline = dl.Deadline(time_limit, 2**13, granularity=8,
+                               maximum=segment_size)
+    threads = threads or os.cpu_count()
+
+    def sift(lo, hi):
+        """Sift segment, extract its primes and format them as lines."""
+        segment = sieves.sieve_segment_odd(lo, hi, base_primes)
+        primes = 2 * (np.flatnonzero(segment) + lo) + 1
+        return primes, ''.join('{}\n'.format(p) for p in primes.tolist())
+
+    segments = sieves.map_segments(sift, dl.chunk_bounds(0, end,
+                                                         segment_size,
+                                                         deadline,
+                                                         threads == 1),
+                                   threads, deadline)
+    with open(outfile, 'w', encoding='UTF-8') as f:
+        # Special treatment for small limits (<= 2)
+        if limit_specified >= 2:
+            f.write('{}\n'.format(2))
+            for item in passes:
+                item.update(np.array([2], dtype=np.int64))
+        # Additional try block for handling keyboard interrupt
+        try:
+            with Progress(end, progress_bar_active, 2) as bar:
+                for lo, hi, (primes, lines) in segments:
+                    f.write(lines)
+                    for item in passes:
+                        item.update(primes)
+                    last_iter = hi
+                    bar.update(hi - lo, len(primes))
+            if deadline is not None and deadline.reached:
+                limit_actual = max(2 * last_iter - 1, min(limit_specified, 2))
+                dl.report(deadline, last_iter, end, limit_actual)
+                interrupt = True
+        except KeyboardInterrupt:
+            limit_actual = max(2 * last_iter - 1, min(limit_specified, 2))
+            print('[KeyboardInterrupt exception] Interrupt at iteration '
+                  ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+            print('[KeyboardInterrupt exception] Actually '
+                  'tested integer range is [0, '
+                  '{}].'.format(limit_actual))
+            interrupt = True
+        finally:
+            segments.close()
+    return interrupt, last_iter, limit_actual
+
+
+def alg_parallel(sieve_method, divisorfunc, limit_specified, outfile,
+                 jobs=None, progress_bar_active=True, chunk_size=None,
+                 time_limit=None):
+    """Check candidates in parallel worker processes (ordered writing)."""
+    # Initialize variables
+    jobs = jobs or sieves_parallel.multiprocessing.cpu_count()
+    interrupt = False
+    limit_actual = limit_specified
+    last_iter, end = sieves_parallel.iteration_range(sieve_method,
+                                                     limit_specified)
+    deadline = None
+    if time_limit is not None:
+        deadline = dl.Deadline(time_limit, 2**6 * jobs)
+    results = sieves_parallel.ordered_results(sieve_method, divisorfunc,
+                                              limit_specified, jobs,
+                                              chunk_size, deadline)
+    with open(outfile, 'w', encoding='UTF-8') as f:
+        for p in sieves_parallel.prefix_primes(sieve_method, limit_specified):
+            f.write('{}\n'.format(p))
+        # Additional try block for handling keyboard interrupt
+        try:
+            # Chunks arrive in order, so they are written in order
+            scale = sieves_parallel.iteration_scale(sieve_method)
+            with Progress(end - last_iter, progress_bar_active,
+                          scale) as bar:
+                for task, chunk in results:
+                    f.write(''.join('{}\n'.format(p) for p in chunk))
+                    bar.update(task[4] - task[3], len(chunk))
+                    last_iter = task[4]
+            if deadline is not None and deadline.reached:
+                limit_actual = sieves_parallel.tested_limit(sieve_method,
+                                                            limit_specified,
+                                                            last_iter)
+                dl.report(deadline, last_iter, end, limit_actual)
+                interrupt = True
+        except KeyboardInterrupt:
+            limit_actual = sieves_parallel.tested_limit(sieve_method,
+                                                        limit_specified,
+                                                        last_iter)
+            print('[KeyboardInterrupt exception] Interrupt at iteration '
+                  ' {} of {} ({:6.2f}%).'.format(last_iter, end, last_iter / end * 100))
+            print('[KeyboardInterrupt exception] Actually '
+                  'tested integer range is [0, '
+                  '{}].'.format(limit_actual))
+            interrupt = True
+        finally:
+            results.close()
+            return (interrupt,
+                    sieves_parallel.reported_iteration(sieve_method,
+                                                       last_iter),
+                    limit_actual)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Memory-mapped smallest-prime-factor table and factorization."""
+
+import numpy as np
+from progress import Progress
+
+
+def build_spf(limit, path, progress_bar_active=True, chunk=2**22):
+    """Write smallest-prime-factor table for [0, limit] to .npy file.
+
+    Temporaries (masks of unmarked entries) are bounded by chunk elements.
+    """
+    if limit >= 2**32:
+        raise ValueError('limit {} exceeds uint32 table range'.format(limit))
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint32,
+                                      shape=(limit + 1,))
+    table[:] = 0
+    table[2::2] = 2
+    # Mark odd multiples of odd primes that are still unmarked
+    iterations = range(3, int(np.sqrt(limit)) + 1, 2)
+    with Progress(len(iterations), progress_bar_active,
+                  unit='iterations') as bar:
+        for part in bar.chunks(iterations):
+            for p in part:
+                if table[p] == 0:
+                    for lo in range(p * p, limit + 1, 2 * p * chunk):
+                        multiples = table[lo:lo + 2 * p * chunk:2 * p]
+                        multiples[multiples == 0] = p
+    # Remaining unmarked numbers are prime and their own smallest factor
+    for lo in range(0, limit + 1, chunk):
+        part = table[lo:lo + chunk]
+        primes = np.flatnonzero(part == 0)
+        part[primes] = primes + lo
+    table[:2] = (0, 1)[:limit + 1]
+    table.flush()
+    return table
+
+
+def load_spf(path):
+    """Load smallest-prime-factor table as read-only memory map."""
+    return np.load(path, mmap_mode='r')
+
+
+def factorize(number, spf):
+    """Determine prime factors of number (with multiplicity)."""
+    if number >= len(spf):
+        raise ValueError('{} exceeds table limit {}'.format(number,
+                                                           len(spf) - 1))
+    factors = []
+    while number > 1:
+        p = int(spf[number])
+        factors.append(p)
+        number //= p
+    return factors
+
+
+def factorize_batch(numbers, spf):
+    """Determine prime factors of many numbers at once.
+
+    Return array with one row per number holding its prime factors in
+    ascending order, padded with zeros.
+    """
+    numbers = np.array(numbers, dtype=np.int64, ndmin=1)
+    if len(numbers) == 0:
+        return np.zeros((0, 0), dtype=np.uint32)
+    if numbers.max() >= len(spf):
+        raise ValueError('{} exceeds table limit {}'.format(numbers.max(),
+                                                           len(spf) - 1))
+    width = max(int(numbers.max()).bit_length() - 1, 1)
+    factors = np.zeros((len(numbers), width), dtype=np.uint32)
+    for column in range(width):
+        active = np.flatnonzero(numbers > 1)
+        if len(active) == 0:
+            return factors[:, :column]
+        p = spf[numbers[active]]
+        factors[active, column] = p
+        numbers[active] //= p
+    return factors
+
+
+def divisors(number, spf):
+    """Determine all divisors of number from its prime factorization."""
+    if number < 1:              # 0 has no divisors
+        return []
+    divs = [1]
+    factors = factorize(number, spf)
+    for p in sorted(set(factors)):
+        powers = [p**k for k in range(1, factors.count(p) + 1)]
+        divs += [d * q for d in divs for q in powers]
+    return sorted(divs)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.analytics."""
+
+import eratosthenes.sieves as sv
+from eratosthenes.analytics import PrimeAnalytics
+
+primes = [i for i in range(10000) if sv.isprime_sqrt(i)]
+
+
+def test_chunk_independence():
+    whole = PrimeAnalytics()
+    whole.update(primes)
+    for size in (1, 2, 3, 7, 100):
+        chunked = PrimeAnalytics()
+        for i in range(0, len(primes), size):
+            chunked.update(primes[i:i + size])
+        assert chunked.header() == whole.header()
+
+
+def test_counts():
+    analytics = PrimeAnalytics()
+    analytics.update(primes)
+    pairs = list(zip(primes, primes[1:]))
+    assert analytics.count == len(primes)
+    assert analytics.tuples['twin'] == sum(q - p == 2 for p, q in pairs)
+    assert analytics.tuples['twin'] == 205
+    assert analytics.tuples['quadruplet'] == 12
+    assert analytics.tuples['cousin'] == sum(p + 4 in primes for p in primes)
+    small = PrimeAnalytics()
+    small.update([p for p in primes if p <= 100])
+    assert small.tuples['cousin'] == 8
+    assert analytics.max_gap == 36
+    assert analytics.records[:4] == [(1, 2), (2, 3), (4, 7), (6, 23)]
+    assert sum(count for gap, count in analytics.gap_histogram()) == \
+        len(primes) - 1
+
+
+def test_empty():
+    analytics = PrimeAnalytics()
+    analytics.update([])
+    assert ['Largest prime', '-'] in analytics.header()
+
+
+def test_alg_bitmap_passes():
+    analytics = PrimeAnalytics()
+    assert sv.alg_bitmap(9999, False, 64, [analytics], False)[0] == []
+    reference = PrimeAnalytics()
+    reference.update(primes)
+    assert analytics.header() == reference.header()
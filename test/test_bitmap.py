@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.bitmap."""
+
+import eratosthenes.sieves as sv
+from eratosthenes.bitmap import PrimeBitmap
+
+limit = 20000
+reference = [i for i in range(limit + 1) if sv.isprime_sqrt(i)]
+# Small blocks and select rate exercise the rank/select indexes
+bitmap = PrimeBitmap.from_primes(reference, limit, block_bytes=4,
+                                 select_rate=7)
+
+
+def test_iteration():
+    assert list(bitmap) == reference
+    assert len(bitmap) == len(reference)
+
+
+def test_is_prime():
+    for i in range(limit + 1):
+        assert bitmap.is_prime(i) is (i in reference)
+
+
+def test_pi():
+    count = 0
+    for i in range(limit + 1):
+        if sv.isprime_sqrt(i):
+            count += 1
+        assert bitmap.pi(i) == count
+
+
+def test_nth_prime():
+    for n, prime in enumerate(reference, start=1):
+        assert bitmap.nth_prime(n) == prime
+    assert bitmap[-1] == reference[-1]
+    assert bitmap[3:6] == reference[3:6]
+
+
+def test_small_limits():
+    expected = {0: [], 1: [], 2: [2], 3: [2, 3]}
+    for key in expected:
+        assert list(PrimeBitmap.from_primes([2, 3], key)) == expected[key]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.calibrate."""
+
+import eratosthenes.calibrate as cal
+
+
+def test_crossovers():
+    limits = [10, 100, 1000, 10000]
+    timings = {'6k': [1, 2, 30, None], 'bitmap': [5, 4, 3, 3]}
+    assert cal.crossovers(limits, timings) == [[0, '6k'], [1000, 'bitmap']]
+
+
+def test_calibrate(tmp_path):
+    path = str(tmp_path / 'profile' / 'calibration.json')
+    profile = cal.calibrate(path, 1000, -1)
+    assert profile['limits'] == [10, 100, 1000]
+    assert cal.load_profile(path) == profile
+    assert cal.load_profile(str(tmp_path / 'missing.json')) is None
+    assert cal.select_engine(profile, 10**6) in cal.engines
+
+
+def test_select_engine():
+    profile = {'limits': [10, 1000, 100000],
+               'timings': {'6k': [1, 2, 3], 'bitmap': [2, 1, 1]},
+               'crossovers': [[0, '6k'], [1000, 'bitmap']]}
+    assert cal.select_engine(profile, 50) == '6k'
+    assert cal.select_engine(profile, 10**9) == 'bitmap'
+    assert cal.select_engine(None, 10) == '6k'
+    assert cal.select_engine(None, 10**9) == 'bitmap'
+    # Bitmap of 10**9 does not fit into 1 MiB, listed primes neither
+    assert cal.select_engine(profile, 10**9, 2**20) == 'bitmap'
+    assert cal.select_engine(profile, 10**7, 2**30, True) == 'bitmap'
+    # Bytearray sieve has no storage mode
+    profile['crossovers'].append([10**6, 'bytearray'])
+    assert cal.select_engine(profile, 10**7) == 'bytearray'
+    assert cal.select_engine(profile, 10**7, mode='storage') in \
+        [name for name in cal.engines
+         if cal.engines[name]['sievemethod'] in cal.fn.storage_methods]
+    # Bytearray sieve has no time limit either
+    assert cal.engines[cal.select_engine(profile, 10**7, time_limit=1.0)][
+        'sievemethod'] in cal.fn.deadline_methods
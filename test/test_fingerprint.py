@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.fingerprint."""
+
+import os
+import subprocess
+import sys
+import eratosthenes.sieves as sv
+from eratosthenes.fingerprint import StreamFingerprint, verify
+
+primes = list(sv.alg_bitmap(100000, False)[0])
+script = os.path.join(os.path.dirname(__file__), '..', 'src', 'eratosthenes',
+                      'eratosthenes.py')
+
+
+def test_chunk_independence():
+    whole = StreamFingerprint()
+    whole.update(primes)
+    for size in (1, 5, 1000):
+        chunked = StreamFingerprint()
+        for i in range(0, len(primes), size):
+            chunked.update(primes[i:i + size])
+        assert chunked.values() == whole.values()
+    assert whole.count == 9592 and whole.last == 99991
+    assert whole.sum == sum(primes)
+
+
+def test_order_sensitivity():
+    whole = StreamFingerprint()
+    whole.update(primes)
+    swapped = StreamFingerprint()
+    swapped.update(primes[1::-1] + primes[2:])
+    assert swapped.digest() != whole.digest()
+    assert swapped.sum == whole.sum
+
+
+def test_verify(tmp_path):
+    fingerprint = StreamFingerprint()
+    fingerprint.update(primes)
+    path = tmp_path / 'primes.dat'
+    path.write_text('#   {:<31} {}\n'.format('Fingerprint (BLAKE2b-128)',
+                                               fingerprint.digest()) +
+                    '#   Prime count                     9592\n' +
+                    ''.join('{}\n'.format(p) for p in primes))
+    recorded, computed = verify(str(path))
+    assert recorded == {'fingerprint': computed['fingerprint'],
+                        'count': '9592'}
+    path.write_text(path.read_text().replace('\n99991\n', '\n99989\n'))
+    recorded, computed = verify(str(path))
+    assert recorded['fingerprint'] != computed['fingerprint']
+
+
+def test_empty_output(tmp_path):
+    assert StreamFingerprint().header()[-1] == ['Last prime', '-']
+    outfile = str(tmp_path / 'primes.dat')
+    for limit in ('0', '1'):
+        for method in ('6k', 'bitmap'):
+            run = subprocess.run([sys.executable, script, '-q', '-s', method,
+                                  limit, outfile])
+            assert run.returncode == 0
+            recorded, computed = verify(outfile)
+            assert recorded == computed
+            assert recorded['count'] == '0' and recorded['last'] == '-'
+
+
+def test_verify_missing(tmp_path):
+    run = subprocess.run([sys.executable, script, '--verify',
+                          str(tmp_path / 'missing.dat')],
+                         stderr=subprocess.PIPE)
+    assert run.returncode == 2 and b'No such file' in run.stderr
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.functions."""
+
+import eratosthenes.functions as fn
+from eratosthenes.classes import StoredPrimes
+
+
+def test_parse_size():
+    assert fn.parse_size('1000') == 1000
+    assert fn.parse_size('512K') == 512 * 2**10
+    assert fn.parse_size('1.5g') == 3 * 2**29
+    assert fn.parse_size('2MB') == 2 * 2**20
+
+
+def test_plan_memory():
+    assert fn.plan_memory('6k', 10**9, 2**40, 'memory', False, -1)[0] == \
+        'memory'
+    assert fn.plan_memory('6k', 10**9, 2**20, 'memory', False, -1)[0] == \
+        'storage'
+    mode, segment_size = fn.plan_memory('bitmap', 10**10, 2**40, 'memory',
+                                        False, -1)
+    assert mode == 'memory' and segment_size == 2**24
+    mode, segment_size = fn.plan_memory('bitmap', 10**10, 2**20, 'memory',
+                                        False, -1)
+    assert mode == 'storage' and segment_size == 2**13
+
+
+def test_estimate_memory():
+    one = fn.estimate_memory('divisors', 10**6, functions=['phi'])
+    five = fn.estimate_memory('divisors', 10**6, functions=[
+        'divisors', 'phi', 'mu', 'sigma', 'omega'])
+    assert one[1] == five[1] and five[0] == 3 * one[0]
+    assert five[0] == 8 * 6 * (10**6 + 1)
+
+
+def test_stored_primes(tmp_path):
+    path = tmp_path / 'primes.temp'
+    path.write_text('2\n3\n5\n7\n')
+    primes = StoredPrimes(str(path))
+    assert len(primes) == 4
+    assert list(primes) == ['2', '3', '5', '7']
+    assert [chunk.tolist() for chunk in primes.iter_chunks(3)] == \
+        [[2, 3, 5], [7]]
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.primestore."""
+
+import numpy as np
+import pytest
+import eratosthenes.sieves as sv
+import eratosthenes.primestore as ps
+
+reference = [i for i in range(20001) if sv.isprime_sqrt(i)]
+
+
+def test_varint():
+    values = np.array([0, 1, 127, 128, 300, 2**14, 2**40, 2**63 - 1],
+                      dtype=np.uint64)
+    data = ps.encode_varint(values)
+    assert len(data) == 1 + 1 + 1 + 2 + 2 + 3 + 6 + 9
+    assert np.array_equal(ps.decode_varint(data), values)
+
+
+def test_store():
+    # Small blocks and chunks across block boundaries
+    store = ps.PrimeStore(block_size=100)
+    for i in range(0, len(reference), 33):
+        store.update(reference[i:i + 33])
+    assert len(store) == len(reference)
+    assert list(store) == reference
+    assert store[0] == 2 and store[-1] == reference[-1]
+    assert store[1000] == reference[1000]
+    assert store[98:103] == reference[98:103]
+    # Gaps below 256 take one byte each
+    assert store.nbytes_payload == sum(store.counts) - len(store.counts)
+    with pytest.raises(IndexError):
+        store[len(reference)]
+
+
+@pytest.mark.parametrize('compress', [None, 'gzip', 'lzma'])
+def test_file(tmp_path, compress):
+    path = str(tmp_path / 'primes.primes')
+    ps.write(path, '# header\n', [reference[:500], reference[500:]],
+             compress, block_size=256)
+    assert ps.detect_compression(path) == compress
+    assert ps.is_packed(path)
+    assert np.concatenate(list(ps.iter_chunks(path))).tolist() == reference
+    index = ps.read_index(path)
+    assert [count for first, count, offset in index] == [256] * 8 + [214]
+    first, count, offset = index[3]
+    assert first == reference[3 * 256]
+    assert ps.read_block(path, offset).tolist() == \
+        reference[3 * 256:4 * 256]
+    header, store = ps.load(path)
+    assert header == '# header\n'
+    assert list(store) == reference
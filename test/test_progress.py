@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.progress."""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import eratosthenes.progress as pg
+
+script = os.path.join(os.path.dirname(__file__), '..', 'src', 'eratosthenes',
+                      'eratosthenes.py')
+
+
+def test_chunks():
+    found = []
+    iterations = range(3, 20001, 2)
+    bar = pg.Progress(len(iterations), active=False, scale=2)
+    visited = []
+    for part in bar.chunks(iterations, found.__len__, chunk_size=7):
+        for i in part:
+            visited.append(i)
+            if i % 3 == 0:
+                found.append(i)
+    bar.close()
+    assert visited == list(iterations)
+    assert bar.done == len(iterations)
+    assert bar.primes == len(found)
+    assert bar.values(bar.start + 1)['rate'] == 2 * len(iterations)
+
+
+def test_report():
+    stream = io.StringIO()
+    pg.telemetry = io.StringIO()
+    try:
+        with pg.Progress(100, active=True, interval=0, stream=stream) as bar:
+            bar.update(40, 10)
+            bar.update(60, 5)
+        lines = [json.loads(line)
+                 for line in pg.telemetry.getvalue().splitlines()]
+    finally:
+        pg.telemetry = None
+    assert [line['done'] for line in lines] == [40, 100, 100]
+    assert lines[-1]['final'] is True and lines[-1]['primes'] == 15
+    assert lines[-1]['fraction'] == 1.0
+    assert stream.getvalue().startswith('\r[progress]  40.00%')
+    assert stream.getvalue().endswith('\n')
+
+
+
+def test_engine_telemetry(tmp_path):
+    outfile = str(tmp_path / 'primes.dat')
+    with open(str(tmp_path / 'progress.jsonl'), 'w+') as f:
+        run = subprocess.run([sys.executable, script, '-q', '--progress-fd',
+                              str(f.fileno()), '-s', 'bitmap', '1000000',
+                              outfile], pass_fds=(f.fileno(),))
+        f.seek(0)
+        lines = [json.loads(line) for line in f]
+    assert run.returncode == 0
+    assert lines[-1]['final'] is True and lines[-1]['done'] == 500000
+    with open(outfile) as f:
+        assert sum(1 for line in f if not line.startswith('#')) == 78498
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.shards."""
+
+import os
+import subprocess
+import sys
+import pytest
+import eratosthenes.sieves as sv
+import eratosthenes.shards as shards
+
+script = os.path.join(os.path.dirname(__file__), '..', 'src', 'eratosthenes',
+                      'eratosthenes.py')
+
+
+def test_iter_range():
+    for lower, upper in ((0, 100), (2, 3), (3, 97), (4, 96), (50, 49)):
+        primes = [p for chunk in sv.iter_range(lower, upper, 8)
+                  for p in chunk.tolist()]
+        assert primes == [i for i in range(lower, upper + 1)
+                          if sv.isprime_sqrt(i)]
+
+
+def test_sharded_run(tmp_path):
+    manifest = str(tmp_path / 'run.json')
+    shards.make_manifest(10, 100000, 5, manifest)
+    # Run each shard in its own worker process
+    workers = [subprocess.Popen([sys.executable, script, '-q', '--shard',
+                                 str(k), '--manifest', manifest])
+               for k in range(5)]
+    assert all(worker.wait() == 0 for worker in workers)
+    merged = str(tmp_path / 'merged.dat')
+    assert shards.merge(manifest, merged, -1) == 9588
+    with open(merged) as f:
+        primes = [int(line) for line in f if not line.startswith('#')]
+    assert primes == [i for i in range(10, 100001) if sv.isprime_sqrt(i)]
+
+
+def test_merge_validation(tmp_path):
+    manifest = str(tmp_path / 'run.json')
+    shards.make_manifest(0, 1000, 3, manifest)
+    shards.run_shard(manifest, 0)
+    shards.run_shard(manifest, 2)
+    assert shards.merge(manifest, None, -1) is None
+    shards.run_shard(manifest, 1)
+    assert shards.merge(manifest, None, -1) == 168
+    infos = [shards.read_shard_info(shards.shard_path(manifest, shard))
+             for shard in shards.load_manifest(manifest)['shards']]
+    assert shards.check_coverage({'lower': 0, 'upper': 1000}, infos) == []
+    assert shards.check_coverage({'lower': 0, 'upper': 1001}, infos) != []
+    assert shards.check_coverage({'lower': 0, 'upper': 1000},
+                                 infos[:1] + infos[2:]) != []
+    # Corrupted prime line is detected without OUTFILE as well
+    path = shards.shard_path(manifest, shards.load_manifest(manifest)
+                             ['shards'][1])
+    with open(path) as f:
+        text = f.read()
+    with open(path, 'w') as f:
+        f.write(text.replace('\n401\n', '\n403\n'))
+    assert shards.merge(manifest, None, -1) is None
+    with pytest.raises(ValueError):
+        shards.run_shard(manifest, 3)
+
+
+def test_missing_manifest(tmp_path):
+    manifest = str(tmp_path / 'missing.json')
+    for option in (['--shard', '0'], ['--merge']):
+        run = subprocess.run([sys.executable, script, '-q'] + option +
+                             ['--manifest', manifest],
+                             stderr=subprocess.PIPE)
+        assert run.returncode == 2 and b'No such file' in run.stderr
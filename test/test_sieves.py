@@ -2,8 +2,21 @@
 # -*- coding: utf-8 -*-
 """Test functions for eratosthenes.sieves."""
 
+import os
+import subprocess
+import sys
+from math import gcd
+import numpy as np
+import pytest
 import eratosthenes.sieves as sv
+import eratosthenes.sieves_parallel as sp
+import eratosthenes.sieves_pure as spure
 from eratosthenes.classes import SieveMethod as sm
+from eratosthenes.primestore import PrimeStore
+
+
+script = os.path.join(os.path.dirname(__file__), '..', 'src', 'eratosthenes',
+                      'eratosthenes.py')
 
 
 def test_divisors_all():
@@ -116,3 +129,113 @@ def test_alg_fk():
     for key in primesdict:
         assert sv.alg_fk(sm('3k'), sv.isprime_all,
                          key, False)[0] == primesdict[key]
+
+
+def test_alg_bitmap():
+    for key in primesdict:
+        assert list(sv.alg_bitmap(key, False)[0]) == primesdict[key]
+    for key in primesdict:
+        assert list(sv.alg_bitmap(key, False, 8)[0]) == primesdict[key]
+    assert len(sv.alg_bitmap(1000000, False, 4096)[0]) == 78498
+
+
+def test_alg_bitmap_threads():
+    for key in primesdict:
+        assert list(sv.alg_bitmap(key, False, 8, threads=3)[0]) == \
+            primesdict[key]
+    serial = sv.alg_bitmap(1000000, False, 4096)[0]
+    store = PrimeStore()
+    threaded = sv.alg_bitmap(1000000, False, 4096, passes=[store],
+                             threads=4)[0]
+    assert np.array_equal(threaded.bits, serial.bits)
+    assert list(store) == list(serial)
+    # Worker errors are not swallowed by the result handling
+    with pytest.raises(ValueError):
+        sv.alg_bitmap(1000, False, threads=-2)
+    run = subprocess.run([sys.executable, script, '-q', '-s', 'bitmap', '-T',
+                          '-2', '1000'], stderr=subprocess.PIPE)
+    assert run.returncode == 2 and b'threads' in run.stderr
+
+
+def test_multiplicative():
+    table = sv.multiplicative(300, ('divisors', 'phi', 'mu', 'sigma',
+                                    'omega'), False)[0]
+    assert table[:, 1].tolist() == sv.numdivisors(300, False)[:, 1].tolist()
+    for n, divisors, phi, mu, sigma, omega in table.tolist():
+        divs = sv.divisors_all(n)
+        factors = [p for p in divs if sv.isprime_sqrt(p)]
+        squarefree = all(n % (p * p) for p in factors)
+        assert divisors == len(divs)
+        assert phi == sum(gcd(n, k) == 1 for k in range(1, n + 1))
+        assert mu == ((-1)**len(factors) if squarefree else 0)
+        assert sigma == sum(divs)
+        assert omega == len(factors)
+    for method in ('divisors', 'spf'):
+        for option in ('-n', '-A'):
+            run = subprocess.run([sys.executable, script, '-q', '-s', method,
+                                  option, '20'], stderr=subprocess.PIPE)
+            assert run.returncode == 2 and b'--no-primes' in run.stderr
+
+
+def test_alg_parallel():
+    for name in ('all', 'odd', '6k', '4k', '3k'):
+        for key in primesdict:
+            assert sp.alg_parallel(sm(name), sv.isprime_sqrt, key, 2, False,
+                                   3)[0] == primesdict[key]
+        for key in primesdict:
+            assert sp.alg_parallel(sm(name), sv.isprime_sqrt, key, 1,
+                                   False)[0] == primesdict[key]
+
+
+def test_time_limit():
+    prime, interrupt, last_iter, limit_actual = sp.alg_parallel(
+        sm('6k'), sv.isprime_sqrt_odd, 10**12, 1, False, time_limit=0.2)
+    assert interrupt is True and 0 < limit_actual < 10**12
+    assert prime == list(sv.alg_bitmap(limit_actual, False)[0])
+    prime, interrupt, last_iter, limit_actual = sv.alg_bitmap(
+        10**9, False, 2**16, time_limit=0.2)
+    assert interrupt is True and 0 < limit_actual < 10**9
+    assert prime.limit == limit_actual
+    assert len(prime) == len(sv.alg_bitmap(limit_actual, False)[0])
+    # Deadline before the first chunk still covers the prefix primes
+    prime, interrupt, last_iter, limit_actual = sp.alg_parallel(
+        sm('6k'), sv.isprime_sqrt_odd, 1000, 1, False, time_limit=1e-9)
+    assert prime == [2, 3] and limit_actual == 3
+    prime, interrupt, last_iter, limit_actual = sv.alg_bitmap(
+        1000, False, time_limit=1e-9)
+    assert list(prime) == [2] and limit_actual == 2
+    run = subprocess.run([sys.executable, script, '-q', '-t', '0', '1000'],
+                         stderr=subprocess.PIPE)
+    assert run.returncode == 2 and b'time limit' in run.stderr
+    # Segments sifted by threads stop at the deadline, too
+    prime, interrupt, last_iter, limit_actual = sv.alg_bitmap(
+        10**11, False, 2**24, store=False, time_limit=0.3, threads=8)
+    assert interrupt is True and 0 < limit_actual < 10**11
+
+
+def test_alg_bytearray():
+    for key in primesdict:
+        assert spure.alg_bytearray(key, False)[0] == primesdict[key]
+    assert spure.alg_bytearray(10**6, False)[0] == \
+        list(sv.alg_bitmap(10**6, False)[0])
+    for number in (0, 1, 3, 4, 99, 100, 10**12, 10**12 - 1):
+        assert spure.isqrt(number)**2 <= number < \
+            (spure.isqrt(number) + 1)**2
+
+
+def test_without_numpy(tmp_path):
+    # Package shadowing NumPy so that importing it fails
+    (tmp_path / 'numpy').mkdir()
+    (tmp_path / 'numpy' / '__init__.py').write_text('raise ImportError\n')
+    env = dict(os.environ, PYTHONPATH=str(tmp_path))
+    outfile = str(tmp_path / 'primes.dat')
+    for method in ('bytearray', '6k'):
+        run = subprocess.run([sys.executable, script, '-q', '-s', method,
+                              '1000', outfile], env=env)
+        assert run.returncode == 0
+        with open(outfile) as f:
+            primes = [int(line) for line in f if not line.startswith('#')]
+        assert primes == [i for i in range(1001) if sv.isprime_sqrt(i)]
+    run = subprocess.run([sys.executable, script, '-q', '-s', 'bitmap',
+                          '1000'], env=env, stderr=subprocess.PIPE)
+    assert run.returncode == 2 and b'NumPy' in run.stderr
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Test functions for eratosthenes.spf."""
+
+import numpy as np
+import eratosthenes.sieves as sv
+import eratosthenes.spf as spf
+
+
+def test_build_spf(tmp_path):
+    path = str(tmp_path / 'spf.npy')
+    spf.build_spf(1000, path, False)
+    table = spf.load_spf(path)
+    assert len(table) == 1001
+    assert list(table[:12]) == [0, 1, 2, 3, 2, 5, 2, 7, 2, 3, 2, 11]
+    for i in range(2, 1001):
+        assert bool(table[i] == i) is sv.isprime_sqrt(i)
+        assert i % table[i] == 0
+    # Marking in small chunks gives the same table
+    chunked = spf.build_spf(1000, str(tmp_path / 'chunked.npy'), False, 7)
+    assert np.array_equal(chunked, table)
+
+
+def test_factorize(tmp_path):
+    path = str(tmp_path / 'spf.npy')
+    table = spf.build_spf(1000, path, False)
+    assert spf.factorize(1, table) == []
+    assert spf.factorize(360, table) == [2, 2, 2, 3, 3, 5]
+    assert spf.factorize(997, table) == [997]
+    assert spf.divisors(360, table) == sv.divisors_all(360)
+    assert spf.divisors(12, table) == sv.divisors_all(12)
+    numbers = np.arange(1, 1001)
+    batch = spf.factorize_batch(numbers, table)
+    for number, row in zip(numbers, batch):
+        assert [int(p) for p in row if p] == spf.factorize(number, table)